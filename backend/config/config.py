@@ -42,9 +42,24 @@ Config = namedtuple('Config', (
     'model_temp',
     'model_context',
     'model_age',
+    'model_ttl',
 
     'char_limit',
+    'token_limit',
+    'neural_token_limit',
+    'cache_size',
+    'normal_workers',
+    'neural_workers',
+    'normal_rate',
+    'neural_rate',
+    'rate_retries',
+    'rate_backoff',
+    'memory_size',
+    'combined_mode',
+    'batch_retries',
     'word_limit',
+    'lazy_word_limit',
+    'prefetch_pages',
 
     'Upload',  # nested Upload settings
     'App',  # nested App settings
@@ -0,0 +1,75 @@
+import threading
+from typing import Optional
+from backend.logger.logger import logger
+from backend.config.config import CONFIG
+from backend.decoder.model_catalog import ModelInfo
+
+# estimated tokens of the CSV reply per token of the source words, the reply repeats the source words
+REPLY_RATIO = 2.5
+
+
+class BatchSizer(object):
+    """
+    The BatchSizer is a process-wide token budget of the batches of one model, which adapts at runtime.
+    The budget grows additively after clean replies and shrinks multiplicatively after truncated or misaligned
+    replies. It is bounded by the context length and the completion tokens of the model in the catalog.
+    """
+
+    __slots__ = (
+        'model_id',
+        'ceiling',
+        'floor',
+        'limit',
+        'replies',
+        'truncated',
+        '_lock'
+    )
+
+    _sizers: dict[str, 'BatchSizer'] = {}
+    _sizers_lock = threading.Lock()
+
+    def __init__(self, model_id: str, info: Optional[ModelInfo] = None, prompt_tokens: int = 0) -> None:
+        """
+        :param model_id: the id of the model
+        :param info: the catalog entry of the model, the configured budget is the ceiling without it
+        :param prompt_tokens: the estimated tokens of the system prompt
+        """
+        self.model_id = model_id
+        self.ceiling = self._get_ceiling(info = info, prompt_tokens = prompt_tokens)
+        self.floor = min(CONFIG.token_limit // 4, self.ceiling)
+        self.limit = min(CONFIG.token_limit, self.ceiling)
+        self.replies: int = 0
+        self.truncated: int = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_sizer(cls, model_id: str, info: Optional[ModelInfo] = None, prompt_tokens: int = 0) -> 'BatchSizer':
+        with cls._sizers_lock:
+            if model_id not in cls._sizers:
+                cls._sizers[model_id] = cls(model_id = model_id, info = info, prompt_tokens = prompt_tokens)
+            return cls._sizers[model_id]
+
+    @staticmethod
+    def _get_ceiling(info: Optional[ModelInfo], prompt_tokens: int) -> int:
+        if info is None or not info.context_length: return CONFIG.token_limit
+        # the prompt, the source words and the reply share the context
+        tokens = (info.context_length - prompt_tokens) / (1 + REPLY_RATIO)
+        # the reply is limited by the completion tokens of the provider as well
+        if info.max_completion_tokens: tokens = min(tokens, info.max_completion_tokens / REPLY_RATIO)
+        return max(min(int(tokens), CONFIG.neural_token_limit), CONFIG.token_limit // 4)
+
+    def update(self, tokens: int, clean: bool) -> None:
+        """
+        :param tokens: the estimated tokens of the source words of the batch
+        :param clean: True if the reply was complete and all rows matched the source words
+        """
+        with self._lock:
+            self.replies += 1
+            if not clean:
+                self.truncated += 1
+                self.limit = max(self.limit // 2, self.floor)
+                logger.info(f'Batch limit of "{self.model_id}" reduced to {self.limit} tokens, '
+                            f'{self.truncated} of {self.replies} replies truncated or misaligned.')
+            # only a batch near the limit shows, that the limit is sufficient
+            elif 2 * tokens >= self.limit and self.limit < self.ceiling:
+                self.limit = min(self.limit + CONFIG.token_limit // 4, self.ceiling)
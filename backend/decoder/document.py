@@ -0,0 +1,178 @@
+import itertools
+from array import array
+from typing import Iterable, Iterator, Optional, Union
+from collections.abc import Sequence
+from backend.config.config import CONFIG
+from backend.decoder.tokenizer import split_affixes
+from backend.utils.utilities import get_eos_indices
+
+
+class StringColumn(Sequence):
+    """
+    Immutable column of strings stored in one contiguous buffer with an array of offsets.
+    """
+
+    __slots__ = ('_buffer', '_offsets')
+
+    def __init__(self, strings: Iterable[str] = ()) -> None:
+        """
+        :param strings: the strings of the column
+        """
+        strings = strings if isinstance(strings, (list, tuple)) else list(strings)
+        self._buffer: str = ''.join(strings)
+        self._offsets = array('Q', itertools.accumulate(map(len, strings), initial = 0))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0: index += len(self)
+        if not 0 <= index < len(self): raise IndexError('StringColumn index out of range')
+        return self._buffer[self._offsets[index]:self._offsets[index + 1]]
+
+    def iter_range(self, start: int, stop: int) -> Iterator[str]:
+        offsets = self._offsets[start:stop + 1]
+        return map(self._buffer.__getitem__, map(slice, offsets, offsets[1:]))
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iter_range(0, len(self))
+
+    def get_hash(self) -> int:
+        return hash((self._buffer, self._offsets.tobytes()))
+
+
+class WordsView(Sequence):
+    """
+    Read-only view of a range of words of a document column, slicing a view does not copy any words.
+    """
+
+    __slots__ = ('_column', '_start', '_stop')
+
+    def __init__(self, column: Union[StringColumn, list[str]], start: int, stop: int) -> None:
+        """
+        :param column: the column of the document
+        :param start: the index of the first word in the column
+        :param stop: the index after the last word in the column
+        """
+        self._column = column
+        self._start = start
+        self._stop = max(start, stop)
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, 'WordsView', list[str]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1: return [self[i] for i in range(start, stop, step)]
+            return WordsView(self._column, self._start + start, self._start + stop)
+        if index < 0: index += len(self)
+        if not 0 <= index < len(self): raise IndexError('WordsView index out of range')
+        return self._column[self._start + index]
+
+    def __iter__(self) -> Iterator[str]:
+        if isinstance(self._column, StringColumn):
+            return self._column.iter_range(self._start, self._stop)
+        return itertools.islice(self._column, self._start, self._stop)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str): return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f'WordsView({list(self)})'
+
+
+class DecodedDocument(object):
+    """
+    The DecodedDocument is the columnar model of a decoded text. The source words are stored in one
+    string buffer with offsets, the target words in a list, which is filled in place while decoding.
+    The affixes and the sentence boundaries of the source words are computed once on demand.
+    Pages are read as views and only the changed columns are rebuilt when a page is written back.
+    """
+
+    __slots__ = (
+        '_sources',
+        'targets',
+        'generation',
+        '_endofs',
+        '_quotes',
+        '_affixes',
+        '_eos_indices'
+    )
+
+    # the generations of all documents, so the generation identifies the source words across documents
+    _generations = itertools.count(1)
+
+    def __init__(self, source_words: Iterable[str] = (), target_words: Optional[Iterable[str]] = None,
+                 endofs: str = CONFIG.Regex.endofs, quotes: str = CONFIG.Regex.quotes) -> None:
+        """
+        :param source_words: the source words of the document
+        :param target_words: the target words of the document, empty target words if not given
+        :param endofs: the EndOfSentence marks for the sentence boundaries
+        :param quotes: the quotes, which may follow an EndOfSentence mark
+        """
+        self._sources = StringColumn()
+        self.targets: list[str] = []
+        # changes with every new source column, a decoding of a previous generation must not write the targets
+        self.generation: int = 0
+        self._endofs = endofs
+        self._quotes = quotes
+        self._affixes: Optional[list[tuple[str, str, str, str]]] = None
+        self._eos_indices: Optional[array] = None
+        self.set_sources(source_words = source_words, target_words = target_words, endofs = endofs, quotes = quotes)
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def set_sources(self, source_words: Iterable[str], target_words: Optional[Iterable[str]] = None,
+                    endofs: Optional[str] = None, quotes: Optional[str] = None) -> None:
+        """
+        Replaces the source words and resets the target words, if no target words are given.
+        """
+        if endofs is not None: self._endofs = endofs
+        if quotes is not None: self._quotes = quotes
+        self._sources = StringColumn(source_words)
+        self.targets = [''] * len(self._sources) if target_words is None else list(target_words)
+        self.generation = next(self._generations)
+        self._affixes = None
+        self._eos_indices = None
+
+    @property
+    def sources(self) -> WordsView:
+        return WordsView(self._sources, 0, len(self._sources))
+
+    @property
+    def affixes(self) -> list[tuple[str, str, str, str]]:
+        # source word, leading marks, core and trailing marks per source word
+        if self._affixes is None:
+            self._affixes = [(word, *split_affixes(word)) for word in self._sources]
+        return self._affixes
+
+    @property
+    def eos_indices(self) -> array:
+        # the indices after each source word, which ends a sentence
+        if self._eos_indices is None:
+            self._eos_indices = array('Q', get_eos_indices(self._sources, endofs = self._endofs, quotes = self._quotes))
+        return self._eos_indices
+
+    def get_page(self, start: int, stop: int) -> tuple[WordsView, WordsView]:
+        return WordsView(self._sources, start, stop), WordsView(self.targets, start, stop)
+
+    def set_page(self, start: int, stop: int, source_words: list[str], target_words: list[str]) -> None:
+        """
+        Writes the words of a page back, the page may have a different number of words than before.
+        The source column is only rebuilt if any source word of the page was changed.
+        """
+        self.targets[start:stop] = target_words
+        if WordsView(self._sources, start, stop) == source_words: return
+        words = list(self._sources)
+        words[start:stop] = source_words
+        self._sources = StringColumn(words)
+        # the positions of the following words and the sentence boundaries may have moved
+        self.generation = next(self._generations)
+        self._affixes = None
+        self._eos_indices = None
+
+    def get_hash(self) -> int:
+        return hash((self._sources.get_hash(), tuple(self.targets)))
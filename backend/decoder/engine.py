@@ -0,0 +1,39 @@
+import threading
+from typing import Optional
+from backend.logger.logger import logger
+from backend.decoder.job_scheduler import JobScheduler
+
+
+class Engine(object):
+    """
+    Base class of the translator engines. The engines are stateless and shared by all sessions,
+    one engine per translator class and proxy configuration, so their HTTP clients keep their connections alive.
+    """
+
+    __slots__ = ()
+
+    _engines: dict[tuple, 'Engine'] = {}
+    _engines_lock = threading.Lock()
+    # the bounded pool of the upstream requests of all sessions, defined per translator class
+    _scheduler: JobScheduler
+
+    @classmethod
+    def get_engine(cls, proxies: Optional[dict] = None) -> 'Engine':
+        """
+        :param proxies: proxy settings with the keys 'http' and 'https'
+        :return: the shared engine for the proxy settings
+        """
+        proxies = proxies if isinstance(proxies, dict) else {}
+        key = (cls, proxies.get('http', ''), proxies.get('https', ''))
+        with cls._engines_lock:
+            if key not in cls._engines:
+                logger.info(f'Create {cls.__name__} engine')
+                cls._engines[key] = cls(proxies = proxies)
+            return cls._engines[key]
+
+    def get_status(self, user: str) -> tuple[int, float]:
+        """
+        :param user: the user of the decoding job
+        :return: the position of the user in the queue and the estimated seconds until its batches are finished
+        """
+        return self._scheduler.get_status(user)
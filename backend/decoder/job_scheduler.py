@@ -0,0 +1,140 @@
+import math
+import time
+import asyncio
+from typing import Optional
+from collections import Counter, OrderedDict, deque
+
+
+class JobScheduler(object):
+    """
+    The JobScheduler is a process-wide bounded pool of the upstream requests of one translator.
+    The batches of the decoding jobs wait in one queue per user and a free worker is granted to the users
+    round-robin, so the batches of all users are interleaved and a large document does not starve small ones.
+    Only the async translations of the event loop are scheduled. The sync translations, e.g. of scripts,
+    run outside of the event loop and bypass the scheduler, they are bounded by the executor and the rate limiter.
+    """
+
+    __slots__ = (
+        'name',
+        'workers',
+        'duration',
+        '_running',
+        '_queues',
+        '_active'
+    )
+
+    # weight of a new batch duration in the moving average of the batch durations
+    ALPHA = 0.2
+
+    def __init__(self, name: str, workers: int, duration: float = 2.0) -> None:
+        """
+        :param name: the name of the translator for the logs
+        :param workers: the maximum number of concurrent requests of all users
+        :param duration: the initial estimate of the seconds per batch
+        """
+        self.name = name
+        self.workers = max(workers, 1)
+        self.duration = duration
+        self._running: int = 0
+        # the waiting batches of every user in the round-robin order of the users
+        self._queues: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+        # the running batches of every user
+        self._active: Counter = Counter()
+
+    def get_slot(self, user: str) -> 'JobSlot':
+        return JobSlot(scheduler = self, user = user)
+
+    async def acquire(self, user: str) -> None:
+        if self._running < self.workers and not self._queues:
+            self._grant(user)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            # a worker granted at the moment of the cancellation is passed on
+            if future.done() and not future.cancelled():
+                self.release(user, duration = None)
+            else:
+                self._remove(user, future)
+            raise
+
+    def _remove(self, user: str, future: asyncio.Future) -> None:
+        # the batches of a cancelled job do not count for the queue positions and the estimates
+        queue = self._queues.get(user)
+        if queue is None or future not in queue: return
+        queue.remove(future)
+        if not queue: del self._queues[user]
+
+    def _grant(self, user: str) -> None:
+        self._running += 1
+        self._active[user] += 1
+
+    def release(self, user: str, duration: Optional[float] = None) -> None:
+        self._running -= 1
+        self._active[user] -= 1
+        if self._active[user] <= 0: del self._active[user]
+        if duration is not None:
+            self.duration = (1 - self.ALPHA) * self.duration + self.ALPHA * duration
+        self._next()
+
+    def _next(self) -> None:
+        # grant the free workers to the next waiting batch of the next user
+        while self._running < self.workers and self._queues:
+            user, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+            # the batches of a cancelled job are skipped
+            if future.done(): continue
+            self._grant(user)
+            future.set_result(None)
+
+    def get_status(self, user: str) -> tuple[int, float]:
+        """
+        :param user: the user of the decoding job
+        :return: the position of the user in the queue, 0 if none of its batches waits,
+            and the estimated seconds until all batches of the user are finished
+        """
+        users = list(self._queues.keys())
+        position = users.index(user) + 1 if user in self._queues else 0
+        batches = len(self._queues.get(user, ())) + self._active.get(user, 0)
+        if not batches: return position, 0.0
+        # the workers are shared round-robin by all users with waiting or running batches
+        share = self.workers / max(len(set(users) | set(self._active)), 1)
+        return position, math.ceil(batches / min(share, batches)) * self.duration
+
+
+class JobSlot(object):
+    """
+    A worker slot of one user, which is used like a semaphore for every batch of the user.
+    """
+
+    __slots__ = (
+        'scheduler',
+        'user',
+        '_started'
+    )
+
+    def __init__(self, scheduler: JobScheduler, user: str) -> None:
+        """
+        :param scheduler: the scheduler of the translator
+        :param user: the user of the decoding job
+        """
+        self.scheduler = scheduler
+        self.user = user
+        # the start times of the running batches, the batches finish about in the order of their start
+        self._started: deque[float] = deque()
+
+    async def __aenter__(self) -> None:
+        await self.scheduler.acquire(self.user)
+        self._started.append(time.monotonic())
+
+    async def __aexit__(self, exc_type, *exc_info) -> None:
+        started = self._started.popleft() if self._started else None
+        # only finished batches are measured, failed or cancelled batches would distort the estimate
+        duration = None if started is None or exc_type is not None else time.monotonic() - started
+        self.scheduler.release(self.user, duration = duration)
@@ -1,15 +1,22 @@
 import re
 import json
+import bisect
+import asyncio
+import itertools
 from uuid import UUID
-from typing import Union
+from typing import AsyncIterator, Callable, Iterable, Iterator, Optional, Sequence, Union
+from contextlib import contextmanager
 from requests.exceptions import ConnectionError as HTTPConnectionError, ProxyError
 from backend.error.error import DecoderError, NormalTranslatorError, NeuralTranslatorError, catch
 from backend.logger.logger import logger
 from backend.config.config import CONFIG, Regex
 from backend.decoder.normal_translator import NormalTranslator, GOOGLE_TRANSLATOR
 from backend.decoder.neural_translator import NeuralTranslator
+from backend.decoder.tokenizer import get_tokenizer, split_affixes
+from backend.decoder.document import DecodedDocument, WordsView
 from backend.user_data.dictionaries import Dicts
 from backend.user_data.settings import Settings
+from backend.user_data.checkpoints import Checkpoints
 
 
 class LanguageDecoder(object):
@@ -23,14 +30,15 @@ class LanguageDecoder(object):
         'source_language',
         'target_language',
         'source_text',
-        'source_words',
-        'target_words',
+        'document',
         'sentences',
         'dicts',
         'settings',
-        '_normal_trans',
-        '_neural_trans',
-        'pattern'
+        'checkpoints',
+        'pattern',
+        '_decoding',
+        '_generation',
+        '_decoded_key'
     )
 
     def __init__(self,
@@ -46,39 +54,58 @@ class LanguageDecoder(object):
         self.source_language = source_language
         self.target_language = target_language
         self.source_text: str = ''
-        self.source_words: list[str] = []
-        self.target_words: list[str] = []
-        self.sentences: list[str] = []
+        self.document = DecodedDocument()
+        # translated sentences by languages and source sentence, translated on demand
+        self.sentences: dict[tuple[str, str, str], str] = {}
         self.dicts = Dicts(user_uuid = self.user_uuid)
         self.settings = Settings(user_uuid = self.user_uuid)
-        self._normal_trans = NormalTranslator()
-        self._neural_trans = NeuralTranslator()
+        self.checkpoints = Checkpoints(user_uuid = self.user_uuid)
         # creates two groups, that matches anything inside the \s
         self.pattern = re.compile(r'\[\s*(\S[\S ]*\S)\s*(\S[\S ]*\S)\s*\]')
+        # start indices of the sentences, which are decoded at the moment, in the generation of the source words
+        self._decoding: set[int] = set()
+        self._generation: int = 0
+        # languages and model of the current target words, the targets are carried over only if unchanged
+        self._decoded_key: Optional[tuple[str, str, str]] = None
 
-    def _set_normal_trans(self) -> None:
-        self._normal_trans.__config__(
-            source_language = self.source_language,
-            target_language = self.target_language,
-            proxies = self.settings.get_proxies(),
-            endofs = self.regex.endofs,
-            quotes = self.regex.quotes
-        )
+    @property
+    def _normal_trans(self) -> NormalTranslator:
+        return NormalTranslator.get_engine(proxies = self.settings.get_proxies())
 
-    def _set_neural_trans(self) -> None:
-        self._neural_trans.__config__(
-            source_language = self.source_language,
-            target_language = self.target_language,
-            proxies = self.settings.get_proxies(),
-            endofs = self.regex.endofs,
-            quotes = self.regex.quotes,
-            model_name = self.model_name,
-        )
+    @property
+    def _neural_trans(self) -> NeuralTranslator:
+        return NeuralTranslator.get_engine(proxies = self.settings.get_proxies())
 
     @property
     def regex(self) -> Regex:
         return self.settings.regex
 
+    @property
+    def source_words(self) -> WordsView:
+        return self.document.sources
+
+    @source_words.setter
+    def source_words(self, source_words: Iterable[str]) -> None:
+        self.document.set_sources(source_words = source_words, endofs = self.regex.endofs, quotes = self.regex.quotes)
+
+    @property
+    def lazy(self) -> bool:
+        # long texts are decoded page by page on demand
+        return len(self.source_words) > CONFIG.word_limit
+
+    @property
+    def eos_indices(self) -> Sequence[int]:
+        # the shared sentence boundaries of the source words for batching, paging and the sentences
+        return self.document.eos_indices
+
+    @property
+    def target_words(self) -> list[str]:
+        return self.document.targets
+
+    @target_words.setter
+    def target_words(self, target_words: Iterable[str]) -> None:
+        self.document.targets = list(target_words)
+
     @property
     def model_name(self) -> str:
         return self.settings.app.model_name
@@ -95,16 +122,24 @@ class LanguageDecoder(object):
     def get_supported_languages(self, show: bool = False) -> list[str]:
         return self._normal_trans.get_supported_languages(show = show)
 
-    def translate(self, source: list[str], neural = True) -> list[str]:
+    def _get_translator(self, neural: bool = True, eos_indices: Optional[Sequence[int]] = None,
+                        sentences: Optional[dict[str, str]] = None, cache: bool = True
+                        ) -> tuple[Union[NormalTranslator, NeuralTranslator], dict]:
+        if self.model_name not in self.models:
+            logger.warning(f'"{self.model_name}" not found!')
+            self.model_name = GOOGLE_TRANSLATOR
+        languages = dict(source_language = self.source_language, target_language = self.target_language)
+        if neural and self.model_name != GOOGLE_TRANSLATOR:
+            return self._neural_trans, dict(
+                **languages, model_name = self.model_name, endofs = self.regex.endofs, quotes = self.regex.quotes,
+                eos_indices = eos_indices, sentences = sentences)
+        return self._normal_trans, dict(**languages, cache = cache)
+
+    @staticmethod
+    @contextmanager
+    def _handle_errors() -> Iterator[None]:
         try:
-            if self.model_name not in self.models:
-                logger.warning(f'"{self.model_name}" not found!')
-                self.model_name = GOOGLE_TRANSLATOR
-            if neural and self.model_name != GOOGLE_TRANSLATOR:
-                self._set_neural_trans()
-                return self._neural_trans.translate_batch(source)
-            self._set_normal_trans()
-            return self._normal_trans.translate_batch(source)
+            yield
         except ProxyError:
             raise ProxyError
         except HTTPConnectionError:
@@ -114,59 +149,49 @@ class LanguageDecoder(object):
         except NeuralTranslatorError as exception:
             raise DecoderError(exception.message, code = exception.code)
 
-    def _reformat_text(self, text: str) -> str:
+    def translate(self, source: list[str], neural = True, eos_indices: Optional[Sequence[int]] = None,
+                  sentences: Optional[dict[str, str]] = None, cache: bool = True) -> list[str]:
+        with self._handle_errors():
+            translator, params = self._get_translator(neural = neural, eos_indices = eos_indices, sentences = sentences,
+                                                      cache = cache)
+            return translator.translate_batch(source, **params)
+
+    async def translate_async(self, source: list[str], neural = True, cache: bool = True) -> list[str]:
+        with self._handle_errors():
+            translator, params = self._get_translator(neural = neural, cache = cache)
+            return await translator.translate_batch_async(source, **params, user = str(self.user_uuid))
+
+    async def iter_translate_async(self, source: list[str], neural = True, eos_indices: Optional[Sequence[int]] = None,
+                                   sentences: Optional[dict[str, str]] = None
+                                   ) -> AsyncIterator[tuple[int, list[str]]]:
+        with self._handle_errors():
+            translator, params = self._get_translator(neural = neural, eos_indices = eos_indices, sentences = sentences)
+            async for start, targets in translator.iter_translate_async(source, **params, user = str(self.user_uuid)):
+                yield start, targets
+
+    def get_status(self, neural: bool = True) -> tuple[int, float]:
+        # the queue position and the estimated seconds of the decoding job of the user
+        #   the status is polled while decoding, so the translator is looked up without resetting the model
+        if neural and self.model_name != GOOGLE_TRANSLATOR and self.model_name in self.models:
+            return self._neural_trans.get_status(str(self.user_uuid))
+        return self._normal_trans.get_status(str(self.user_uuid))
+
+    def _tokenize(self, text: str) -> list[str]:
         self.dicts.load()
-        # remove new lines. for regex add whitespace at the end of text
-        text = ' '.join(text.split()) + ' '
-        # replace special characters with common ones
-        for chars in self.settings.replacements.keys():
-            text = text.replace(chars, self.settings.replacements.get(chars))
-        if self.regex.quotes and self.regex.close and self.regex.endofs:
-            # swap quotes/brackets with EndOfSentence marks if quotes/brackets are followed by EndOfSentence marks
-            text = re.sub(rf'([{self.regex.quotes}{self.regex.close}])\s*([{self.regex.endofs}])', r'\2\1', text)
-        if self.regex.begins and self.regex.opens:
-            # remove any white whitespaces after "begin marks" and add one whitespace before "begin marks"
-            text = re.sub(rf'([{self.regex.begins}{self.regex.opens}])\s*', r' \1', text)
-        if self.regex.ending and self.regex.close:
-            # remove any white whitespaces before "ending marks" and add one whitespace after "ending marks"
-            text = re.sub(rf'\s*([{self.regex.ending}{self.regex.close}])', r'\1 ', text)
-        if self.regex.puncts:
-            # remove any white whitespaces before "punctuations" and add one whitespace after "punctuations"
-            #   if "punctuations" are followed by letters or whitespace
-            text = re.sub(rf'\s*([{self.regex.puncts}]+)(.+?)\s*', r'\1 \2', text)
-        if self.regex.digits:
-            # remove any whitespaces around "digit marks"
-            text = re.sub(rf'(\d)\s*([{self.regex.digits}])\s*(\d)', r'\1\2\3', text)
-        for quote in self.regex.quotes:
-            # remove any whitespaces inside "quote pairs" and add one whitespaces outside "quote pairs"
-            text = re.sub(rf'([{quote}])\s*(.*?)\s*([{quote}])', r' \1\2\3 ', text)
-        if self.regex.quotes:
-            # remove any whitespaces after "quotes" if followed by "punctuations"
-            text = re.sub(rf'([{self.regex.quotes}])\s+([{self.regex.puncts}])', r'\1\2', text)
-        # remove redundant whitespaces
-        text = ' '.join(text.split())
-        return text
+        return get_tokenizer(regex = self.regex).tokenize(text = text, replace = self.settings.replace)
 
     @staticmethod
     def _strip_word(word: str) -> str:
-        # check word if all non-alphanumeric
-        if bool(re.fullmatch(r'[\W_]*', word)):
-            return word
-        # remove all non-alphanumeric and non-minus characters
-        return re.sub(r'\A[\W_]*|[\W_]*\Z', '', word)
-
-    def _wrap_word(self, source_word: str, target_word: str) -> str:
-        # make sure target word is stripped
-        target_word = self._strip_word(target_word)
-        # check source word if all non-alphanumeric
-        if bool(re.fullmatch(r'[\W_]*', source_word)):
-            return source_word
-        # get marks at the beginning of the source word
-        beg = re.search(r'\A[\W_]*', source_word).group()
-        # get marks at the end of the source word
-        end = re.search(r'[\W_]*\Z', source_word).group()
-        # add marks around the target word
-        return f'{beg}{target_word}{end}'
+        # remove all non-alphanumeric characters around the word, unless the word is all non-alphanumeric
+        prefix, core, _ = split_affixes(word)
+        return core if core else prefix
+
+    def _wrap_word(self, affixes: tuple[str, str, str, str], target_word: str) -> str:
+        source_word, prefix, core, suffix = affixes
+        # keep source word if all non-alphanumeric
+        if not core: return source_word
+        # add marks of the source word around the stripped target word
+        return f'{prefix}{self._strip_word(target_word)}{suffix}'
 
     @catch(DecoderError)
     def split_text(self) -> None:
@@ -174,78 +199,324 @@ class LanguageDecoder(object):
             message = 'Source Text is empty'
             logger.error(message)
             raise DecoderError(message)
-        # reformat text for translator
+        # reformat text for translator and split text into words
         if self.settings.app.reformatting:
-            source_text = self._reformat_text(text = self.source_text)
+            source_words = self._tokenize(text = self.source_text)
         else:
-            source_text = ' '.join(self.source_text.split())
+            source_words = self.source_text.split()
         # add a dot at the end of the text in case of missing EndOfSentence mark
-        if not any(mark in source_text.split()[-1] for mark in self.regex.endofs):
+        if not any(mark in source_words[-1] for mark in self.regex.endofs):
             self.source_text += '.'
-            source_text += '.'
-        # split text into words
-        self.source_words = source_text.split()
+            source_words[-1] += '.'
+        # the target words are empty until decoded
+        # the targets of unchanged sentences are carried over from the previous document
+        decoded = self._get_decoded_sentences() if self._decoded_key == self._get_decoded_key() else {}
+        self.source_words = source_words
+        self._decoded_key = self._get_decoded_key()
+        self._carry_over(decoded = decoded)
+        self._resume()
+        # keep the translated sentences, which are still in the text
+        scr_sentences = set(self._split_sentences())
+        self.sentences = {key: target for key, target in self.sentences.items() if key[2] in scr_sentences}
+
+    def _get_decoded_key(self) -> tuple[str, str, str]:
+        return self.source_language, self.target_language, self.model_name
+
+    def _get_sentence_ranges(self, start: int = 0, stop: Optional[int] = None) -> list[tuple[int, int]]:
+        # word ranges of the sentences in the range, a trailing part without EndOfSentence mark is the last range
+        stop = len(self.source_words) if stop is None else stop
+        bounds = [start, *self.eos_indices[bisect.bisect_right(self.eos_indices, start):
+                                           bisect.bisect_right(self.eos_indices, stop)]]
+        if bounds[-1] < stop: bounds.append(stop)
+        return list(zip(bounds, bounds[1:]))
+
+    def _get_decoded_sentences(self) -> dict[tuple[str, ...], list[list[str]]]:
+        # the target words of every completely decoded sentence by its source words
+        decoded: dict[tuple[str, ...], list[list[str]]] = {}
+        if len(self.target_words) != len(self.source_words): return decoded
+        for start, stop in self._get_sentence_ranges():
+            target_words = self.target_words[start:stop]
+            if all(target_words):
+                decoded.setdefault(tuple(self.source_words[start:stop]), []).append(target_words)
+        return decoded
+
+    def _carry_over(self, decoded: dict[tuple[str, ...], list[list[str]]]) -> None:
+        if not decoded: return
+        carried = 0
+        for start, stop in self._get_sentence_ranges():
+            target_words = decoded.get(tuple(self.source_words[start:stop]))
+            if not target_words: continue
+            # repeated sentences take the targets in order, the last targets are taken for any further repetition
+            self.target_words[start:stop] = target_words.pop(0) if len(target_words) > 1 else target_words[0]
+            carried += 1
+        logger.info(f'Carried over the target words of {carried} unchanged sentences.')
+
+    def _resume(self) -> None:
+        # fill the target words of the batches, which were checkpointed for this document before
+        self.checkpoints.set_document(Checkpoints.get_key(self._get_decoded_key(), self.source_words))
+        resumed = 0
+        for start, target_words in self.checkpoints.load():
+            stop = start + len(target_words)
+            if start < 0 or stop > len(self.target_words) or any(self.target_words[start:stop]): continue
+            self.target_words[start:stop] = target_words
+            resumed += len(target_words)
+        if resumed: logger.info(f'Resumed {resumed} target words from checkpoints.')
+
+    def _drop_checkpoints(self) -> None:
+        # the checkpoints are only needed until all target words of the document are decoded
+        if self.target_words and all(self.target_words): self.checkpoints.remove()
+
+    @property
+    def resumable(self) -> bool:
+        # a decoding of a text at once was interrupted, the missing sentences are decoded on resume
+        #   empty target words alone do not resume, e.g. after a permanent error or cleared by the user
+        return (not self.lazy and len(self.target_words) == len(self.source_words) > 0
+                and not all(self.target_words) and self.checkpoints.is_interrupted())
+
+    @staticmethod
+    def _is_interrupting(exception: Exception) -> bool:
+        # a rate limit or a lost connection interrupts a decoding, which is worth to resume later
+        if isinstance(exception, (ProxyError, HTTPConnectionError)): return True
+        return getattr(exception, 'code', None) == 429
+
+    def _get_decoding(self) -> set[int]:
+        # the sentences in decoding of previous source words are dropped, their start indices may have moved
+        if self._generation != self.document.generation:
+            self._generation = self.document.generation
+            self._decoding.clear()
+        return self._decoding
+
+    def _get_missing_words(self, start: int = 0, stop: Optional[int] = None) -> tuple[list[int], list[int]]:
+        """
+        Gather the source words of the sentences in the range, which are not decoded completely.
+
+        :param start: index of the first source word, has to start a sentence
+        :param stop: index after the last source word, has to end a sentence
+        :return: the indices of the missing words and the sentence boundaries within the missing words
+        """
+        if len(self.target_words) != len(self.source_words):
+            self.target_words[:] = [''] * len(self.source_words)
+        # an empty target word marks a word, which is not decoded yet
+        #   the sentences decoded by another task at the moment are skipped, e.g. of an overlapping page
+        decoding = self._get_decoding()
+        ranges = [(s_start, s_stop) for s_start, s_stop in self._get_sentence_ranges(start, stop)
+                  if not all(self.target_words[s_start:s_stop]) and s_start not in decoding]
+        positions = [i for s_start, s_stop in ranges for i in range(s_start, s_stop)]
+        return positions, list(itertools.accumulate(s_stop - s_start for s_start, s_stop in ranges))
+
+    def _set_target_words(self, positions: list[int], target_words: list[str]) -> list[tuple[int, list[str]]]:
+        """
+        Set the translated target words at the positions of the missing words.
+
+        :param positions: the indices of the translated source words
+        :param target_words: the translated target words
+        :return: the start index and the target words of every consecutive run of words
+        """
+        if len(target_words) > len(positions):
+            message = (f'Length mismatch between source words ({len(positions)}) '
+                       f'and target words ({len(target_words)})!')
+            logger.error(message)
+            raise DecoderError(message)
+        runs, start = [], 0
+        for stop in range(1, len(target_words) + 1):
+            # the missing words may be separated by carried over sentences
+            if stop < len(target_words) and positions[stop] == positions[stop - 1] + 1: continue
+            w_start, w_stop = positions[start], positions[start] + stop - start
+            words = [
+                # keep the target words of the user, e.g. of a partly edited sentence
+                # take source word if target word is empty and add missing marks from source word to target word
+                current or self._wrap_word(affixes = affixes, target_word = target_word if target_word else affixes[0])
+                for current, affixes, target_word in zip(self.target_words[w_start:w_stop],
+                                                          self.document.affixes[w_start:w_stop],
+                                                          target_words[start:stop])
+            ]
+            self.target_words[w_start:w_stop] = words
+            self.checkpoints.add(start = w_start, target_words = words)
+            runs.append((w_start, words))
+            start = stop
+        return runs
 
     @catch(DecoderError)
     def decode_words(self) -> None:
-        logger.info(f'Decode {len(self.source_words)} words.')
-        # strip source words before translation
-        # source_words_strip = list(map(self._strip_word, source_words))
-        target_words = self.translate(source = self.source_words)
-        if len(target_words) != len(self.source_words):
-            message = (f'Length mismatch between source words ({len(self.source_words)}) '
+        # only the sentences without target words are translated
+        positions, eos_indices = self._get_missing_words()
+        logger.info(f'Decode {len(positions)} of {len(self.source_words)} words.')
+        if not positions: return self._drop_checkpoints()
+        # in combined mode the LLM translates the sentences in the same requests
+        sentences = {} if CONFIG.combined_mode else None
+        target_words = self.translate(source = [self.source_words[i] for i in positions], eos_indices = eos_indices,
+                                      sentences = sentences)
+        if len(target_words) != len(positions):
+            message = (f'Length mismatch between source words ({len(positions)}) '
                        f'and target words ({len(target_words)})!')
             logger.error(message)
             raise DecoderError(message)
-        self.target_words.clear()
-        for source_word, target_word in zip(self.source_words, target_words):
-            # take source word if target word is empty
-            target_word = source_word if not target_word else target_word
-            # add missing marks from source word to target word
-            self.target_words.append(self._wrap_word(source_word = source_word, target_word = target_word))
+        self._set_target_words(positions = positions, target_words = target_words)
+        if sentences: self._set_sentences(scr_sentences = list(sentences), tar_sentences = list(sentences.values()))
+        self._drop_checkpoints()
+
+    async def iter_decode_words_async(self, start: int = 0,
+                                      stop: Optional[int] = None) -> AsyncIterator[tuple[int, list[str]]]:
+        """
+        Decode the source words and yield every batch of target words as soon as it is finished.
+        The target words are filled in place, so views of the target words get the batches as well.
+        Only the sentences without target words are translated, e.g. the edited sentences of a text.
+
+        :param start: index of the first source word to decode, has to start a sentence
+        :param stop: index after the last source word to decode, has to end a sentence
+        :return: async iterator of the start index and the target words of a batch
+        """
+        stop = len(self.source_words) if stop is None else stop
+        generation = self.document.generation
+        positions, eos_indices = self._get_missing_words(start = start, stop = stop)
+        logger.info(f'Decode {len(positions)} of {stop - start} words.')
+        if not positions:
+            self._drop_checkpoints()
+            return
+        # in combined mode the LLM translates the sentences in the same requests
+        sentences = {} if CONFIG.combined_mode else None
+        starts = {positions[i] for i in itertools.chain((0,), eos_indices[:-1])}
+        self._get_decoding().update(starts)
+        try:
+            async for offset, target_words in self.iter_translate_async(
+                    source = [self.source_words[i] for i in positions], eos_indices = eos_indices,
+                    sentences = sentences):
+                # the targets of previous source words are dropped, e.g. of a previous document or an edited page
+                if generation != self.document.generation:
+                    logger.info('Stale decoding of previous source words stopped.')
+                    return
+                if sentences:
+                    self._set_sentences(scr_sentences = list(sentences), tar_sentences = list(sentences.values()))
+                    sentences.clear()
+                for b_start, b_target_words in self._set_target_words(positions = positions[offset:],
+                                                                      target_words = target_words):
+                    yield b_start, b_target_words
+            self._drop_checkpoints()
+        finally:
+            if generation == self.document.generation: self._decoding.difference_update(starts)
 
-    def _split_sentences(self, text: str) -> list[str]:
-        # spit text into sentences with consideration of quotes and brackets
-        return re.findall(rf'(.*?[{self.regex.endofs}][{self.regex.quotes}]?)\s+', f'{text} ')
+    @catch(DecoderError)
+    async def decode_words_async(self, on_batch: Optional[Callable[[int, list[str]], None]] = None) -> None:
+        # the decoding is flagged until it is finished, so a cancel or a terminated process is resumable
+        generation, interrupted = self.document.generation, True
+        self.checkpoints.set_interrupted()
+        try:
+            async for start, target_words in self.iter_decode_words_async():
+                if on_batch: on_batch(start, target_words)
+            interrupted = False
+        except Exception as exception:
+            # a permanent error is not resumed, the decoding would fail again
+            interrupted = self._is_interrupting(exception)
+            raise exception
+        finally:
+            if not interrupted and generation == self.document.generation: self.checkpoints.set_interrupted(False)
 
     @catch(DecoderError)
-    def translate_sentences(self) -> None:
-        source_text = ' '.join(self.source_words)
-        scr_sentences = self._split_sentences(text = source_text)
-        logger.info(f'Decode {len(scr_sentences)} sentences.')
-        tar_sentences = self.translate(source = scr_sentences, neural = False)
+    async def decode_range_async(self, start: int, stop: int,
+                                 on_batch: Optional[Callable[[int, list[str]], None]] = None) -> None:
+        """
+        Decode a range of source words in lazy mode, e.g. a page of the grid.
+        The range is skipped if it is decoded already, the sentences decoded at the moment by another range are skipped.
+
+        :param start: index of the first source word, has to start a sentence
+        :param stop: index after the last source word, has to end a sentence
+        :param on_batch: optional callback for every decoded batch with its start index and target words
+        """
+        # an empty target word marks a word, which is not decoded yet
+        if all(self.target_words[start:stop]): return
+        generation = self.document.generation
+        async for b_start, target_words in self.iter_decode_words_async(start = start, stop = stop):
+            if on_batch: on_batch(b_start, target_words)
+        if generation != self.document.generation: return
+        self.apply_dict(start = start, stop = stop)
+        if on_batch: on_batch(start, self.target_words[start:stop])
+
+    def _split_sentences(self, start: int = 0, stop: Optional[int] = None) -> list[str]:
+        # join the source words of every sentence in the range
+        #   a trailing part without EndOfSentence mark is no sentence
+        stop = len(self.source_words) if stop is None else stop
+        eos_indices = self.eos_indices[bisect.bisect_right(self.eos_indices, start):
+                                       bisect.bisect_right(self.eos_indices, stop)]
+        starts = itertools.chain((start,), eos_indices)
+        return [' '.join(self.source_words[s_start:s_stop]) for s_start, s_stop in zip(starts, eos_indices)]
+
+    def _get_sentence_key(self, sentence: str) -> tuple[str, str, str]:
+        return self.source_language, self.target_language, sentence
+
+    def _get_sentences(self, scr_sentences: list[str]) -> list[str]:
+        # source sentence, target sentence and '/N' separator of every sentence
+        sentences = []
+        for source in scr_sentences:
+            sentences.extend([source, self.sentences.get(self._get_sentence_key(source), ''), '/N'])
+        return sentences[:-1]  # remove last '/N'
+
+    def _set_sentences(self, scr_sentences: list[str], tar_sentences: list[str]) -> None:
         if len(tar_sentences) != len(scr_sentences):
             message = (f'Length mismatch between source sentences ({len(scr_sentences)})'
                        f'and target sentences ({len(tar_sentences)})!')
             logger.error(message)
             raise DecoderError(message)
-        self.sentences.clear()
         for source, target in zip(scr_sentences, tar_sentences):
-            self.sentences.extend([source, target, '/N'])
-        self.sentences.pop(-1)  # remove last '/N'
+            self.sentences[self._get_sentence_key(source)] = target
+
+    def _get_missing_sentences(self, scr_sentences: list[str]) -> list[str]:
+        return [source for source in dict.fromkeys(scr_sentences)
+                if self._get_sentence_key(source) not in self.sentences]
 
     @catch(DecoderError)
-    def apply_dict(self) -> None:
+    def translate_sentences(self, start: int = 0, stop: Optional[int] = None) -> list[str]:
+        """
+        Translate the sentences of a range of source words on demand, e.g. the sentences of a page.
+        The translations are cached by their source sentence, so only edited or new sentences are translated.
+
+        :param start: index of the first source word
+        :param stop: index after the last source word
+        :return: source sentence, target sentence and '/N' separator of every sentence in the range
+        """
+        scr_sentences = self._split_sentences(start = start, stop = stop)
+        missing = self._get_missing_sentences(scr_sentences)
+        if missing:
+            logger.info(f'Decode {len(missing)} sentences.')
+            # the sentences are cached by the decoder, not in the word cache of the translator
+            tar_sentences = self.translate(source = missing, neural = False, cache = False)
+            self._set_sentences(scr_sentences = missing, tar_sentences = tar_sentences)
+        return self._get_sentences(scr_sentences)
+
+    @catch(DecoderError)
+    async def translate_sentences_async(self, start: int = 0, stop: Optional[int] = None) -> list[str]:
+        scr_sentences = self._split_sentences(start = start, stop = stop)
+        missing = self._get_missing_sentences(scr_sentences)
+        if missing:
+            logger.info(f'Decode {len(missing)} sentences.')
+            tar_sentences = await self.translate_async(source = missing, neural = False, cache = False)
+            self._set_sentences(scr_sentences = missing, tar_sentences = tar_sentences)
+        return self._get_sentences(scr_sentences)
+
+    @catch(DecoderError)
+    def apply_dict(self, start: int = 0, stop: Optional[int] = None) -> None:
         if not self.dicts.dict_name: return None
         self.dicts.load()
         dictionary = self.dicts.dictionaries.get(self.dicts.dict_name, {})
-        target_words = self.target_words.copy()
-        self.target_words.clear()
-        for source_word, target_word in zip(self.source_words, target_words):
-            # first strip the source word for the dictionary keys
-            source_strip = self._strip_word(source_word)
+        stop = len(self.target_words) if stop is None else stop
+        for i, (affixes, target_word) in enumerate(zip(self.document.affixes[start:stop],
+                                                       self.target_words[start:stop]), start = start):
+            # words, which are not decoded yet in lazy mode, are skipped
+            if not target_word: continue
+            # the stripped source word is the core or the source word itself if it is all non-alphanumeric
+            source_strip = affixes[2] if affixes[2] else affixes[0]
             if source_strip in dictionary.keys():
                 # replace target word if stripped source word is key
                 target_word = dictionary.get(source_strip)
             # add missing marks from source word to target word
-            self.target_words.append(self._wrap_word(source_word = source_word, target_word = target_word))
+            self.target_words[i] = self._wrap_word(affixes = affixes, target_word = target_word)
         return None
 
     @catch(DecoderError)
     def find_replace(self, find: str, repl: str) -> None:
-        for i, (source, target) in enumerate(zip(self.source_words, self.target_words)):
-            self.source_words[i] = source.replace(find, repl)
-            self.target_words[i] = target.replace(find, repl)
+        self.document.set_sources(
+            source_words = [source.replace(find, repl) for source in self.source_words],
+            target_words = [target.replace(find, repl) for target in self.target_words]
+        )
 
     @catch(DecoderError)
     def from_json_str(self, data: str) -> None:
@@ -257,11 +528,14 @@ class LanguageDecoder(object):
                 raise DecoderError('Unequal number of source and target words')
             if any(not isinstance(word, str) for word in words_lists[0] + words_lists[1]):
                 raise DecoderError('Found a non-string value in data')
-            self.source_words = list(words_lists[0])
-            self.target_words = list(words_lists[1])
+            self.source_words = words_lists[0]
+            self.target_words = words_lists[1]
+            self._decoded_key = self._get_decoded_key()
+            self.checkpoints.set_document(Checkpoints.get_key(self._decoded_key, self.source_words))
             self.sentences.clear()
-            if all(isinstance(sentence, str) for sentence in data.get('sentences', [])):
-                self.sentences = data.get('sentences', [])
+            sentences = data.get('sentences', [])
+            if all(isinstance(sentence, str) for sentence in sentences) and len(sentences) % 3 != 1:
+                self._set_sentences(scr_sentences = sentences[0::3], tar_sentences = sentences[1::3])
         except DecoderError as exception:
             raise exception
 
@@ -269,7 +543,9 @@ class LanguageDecoder(object):
     def to_json_str(self) -> str:
         data = {
             'decoded': list(zip(self.source_words, self.target_words)),
-            'sentences': self.sentences
+            'sentences': self._get_sentences(
+                [source for source in self._split_sentences() if self._get_sentence_key(source) in self.sentences]
+            )
         }
         return re.sub(
             self.pattern,
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import openai
+import threading
+import traceback
+from collections import namedtuple
+from backend.logger.logger import logger
+from backend.config.config import CONFIG
+
+FILE_DIR = os.path.dirname(os.path.relpath(__file__))
+
+# Definition of the model metadata kept in the catalog
+ModelInfo = namedtuple('ModelInfo', (
+    'id',
+    'name',
+    'created',
+    'context_length',
+    'max_completion_tokens'
+))
+
+
+class ModelCatalog(object):
+    """
+    The ModelCatalog is a process-wide cache of the available models of one provider.
+    The models are fetched once, refreshed in the background after the time to live
+    and stored as a snapshot on disk for cold starts.
+    """
+
+    __slots__ = (
+        'ttl',
+        'snapshot_path',
+        '_client',
+        '_models',
+        '_fetched',
+        '_lock',
+        '_refreshing'
+    )
+
+    _catalogs: dict[str, 'ModelCatalog'] = {}
+    _catalogs_lock = threading.Lock()
+
+    def __init__(self,
+                 api_url: str = CONFIG.api_url,
+                 api_key: str = '',
+                 ttl: int = CONFIG.model_ttl,
+                 snapshot_path: str = '../user_data/cache/models.json') -> None:
+        """
+        :param api_url: api url to model site
+        :param api_key: decoded api key to get access
+        :param ttl: time to live of the catalog in seconds
+        :param snapshot_path: path to the snapshot of the catalog on disk
+        """
+        self.ttl = ttl
+        self.snapshot_path = os.path.join(FILE_DIR, snapshot_path)
+        self._client = openai.OpenAI(base_url = api_url, api_key = api_key)
+        self._models: dict[str, ModelInfo] = {}
+        self._fetched: float = 0.0
+        self._lock = threading.Lock()
+        self._refreshing: bool = False
+
+    @classmethod
+    def get_catalog(cls, api_url: str, api_key: str) -> 'ModelCatalog':
+        with cls._catalogs_lock:
+            if api_url not in cls._catalogs:
+                cls._catalogs[api_url] = cls(api_url = api_url, api_key = api_key)
+            return cls._catalogs[api_url]
+
+    @property
+    def models(self) -> dict[str, ModelInfo]:
+        with self._lock:
+            if not self._fetched:
+                self._load_snapshot()
+            if not self._fetched:
+                # cold start without snapshot, the first request has to wait for the catalog
+                self._refresh()
+            elif self._is_stale() and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target = self._refresh_background, name = 'ModelCatalog', daemon = True).start()
+            return self._models
+
+    def _is_stale(self) -> bool:
+        # an empty catalog is retried earlier than a complete one
+        ttl = self.ttl if self._models else min(self.ttl, 60)
+        return time.time() > self._fetched + ttl
+
+    def _refresh_background(self) -> None:
+        try:
+            models = self._fetch()
+            with self._lock:
+                self._set_models(models)
+        except Exception as exception:
+            logger.error(f'Could not refresh model catalog with exception: {exception}\n{traceback.format_exc()}')
+            with self._lock:
+                self._fetched = time.time()
+        finally:
+            self._refreshing = False
+
+    def _refresh(self) -> None:
+        try:
+            self._set_models(self._fetch())
+        except Exception as exception:
+            logger.error(f'Could not fetch model catalog with exception: {exception}\n{traceback.format_exc()}')
+            self._fetched = time.time()
+
+    def _set_models(self, models: dict[str, ModelInfo]) -> None:
+        self._models = models
+        self._fetched = time.time()
+        self._save_snapshot()
+        logger.info(f'Model catalog refreshed with {len(models)} models')
+
+    def _fetch(self) -> dict[str, ModelInfo]:
+        time_date = time.time() - CONFIG.model_age * 2592000  # 30d * 24h * 3600s per months
+        models = [
+            model for model in self._client.models.list().data
+            if ':free' in model.id and model.created >= time_date
+               and model.context_length >= CONFIG.model_context
+               and {'text'}.issubset(model.architecture.get('input_modalities'))
+               and {'text'}.issubset(model.architecture.get('output_modalities'))
+               and {'temperature'}.issubset(model.supported_parameters)  # seed
+            # and {'reasoning', 'include_reasoning'}.isdisjoint(model.supported_parameters)
+
+        ]
+        models.sort(key = lambda model: model.name)
+        return {
+            model.name.removesuffix('(free)').strip(): ModelInfo(
+                id = model.id,
+                name = model.name.removesuffix('(free)').strip(),
+                created = model.created,
+                context_length = model.context_length,
+                max_completion_tokens = (getattr(model, 'top_provider', None) or {}).get('max_completion_tokens')
+            ) for model in models
+        }
+
+    def _load_snapshot(self) -> None:
+        if not os.path.isfile(self.snapshot_path): return
+        try:
+            with open(file = self.snapshot_path, mode = 'r', encoding = 'utf-8') as file:
+                data = json.load(file)
+            self._models = {name: ModelInfo(**info) for name, info in data.get('models', {}).items()}
+            self._fetched = data.get('fetched', 0.0)
+            logger.info(f'Model catalog loaded from snapshot with {len(self._models)} models')
+        except Exception as exception:
+            logger.error(f'Could not load model catalog snapshot with exception: {exception}')
+
+    def _save_snapshot(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok = True)
+            data = {
+                'fetched': self._fetched,
+                'models': {name: info._asdict() for name, info in self._models.items()}
+            }
+            # write to a temporary file first, so concurrent processes never read a partial snapshot
+            temp_path = f'{self.snapshot_path}.tmp'
+            with open(file = temp_path, mode = 'w', encoding = 'utf-8') as file:
+                json.dump(data, file, ensure_ascii = False, indent = 4)
+            os.replace(temp_path, self.snapshot_path)
+        except Exception as exception:
+            logger.error(f'Could not save model catalog snapshot with exception: {exception}')
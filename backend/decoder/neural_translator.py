@@ -1,150 +1,406 @@
 import os
 import io
 import csv
-import time
 import httpx
 import base64
 import openai
+import asyncio
+import hashlib
+import difflib
+import functools
+import itertools
 import traceback
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Iterator, Optional, Sequence, Union
+from concurrent.futures import ThreadPoolExecutor
 from requests.exceptions import ConnectionError as HTTPConnectionError, ProxyError
-from openai import APIStatusError, BadRequestError, RateLimitError
-from openai.types.chat import ChatCompletionSystemMessageParam, ChatCompletionUserMessageParam
+from openai import APIConnectionError, APIStatusError, BadRequestError, RateLimitError
+from openai.types.chat import ChatCompletion, ChatCompletionSystemMessageParam, ChatCompletionUserMessageParam
 from backend.error.error import ConfigError, NeuralTranslatorError
 from backend.logger.logger import logger
 from backend.config.config import CONFIG
+from backend.decoder.engine import Engine
+from backend.decoder.model_catalog import ModelCatalog, ModelInfo
+from backend.decoder.batch_sizer import BatchSizer
+from backend.decoder.token_estimator import TokenEstimator
+from backend.decoder.rate_limiter import RateLimiter
+from backend.decoder.job_scheduler import JobScheduler, JobSlot
+from backend.decoder.single_flight import SingleFlight, get_batch_hash
+from backend.decoder.tokenizer import split_affixes
+from backend.user_data.translation_memory import TranslationMemory
 from backend.utils import utilities as utils
 
 FILE_DIR = os.path.dirname(os.path.relpath(__file__))
 
 
-class NeuralTranslator(object):
+class NeuralTranslator(Engine):
     """
     The NeuralTranslator uses NLP to literal translate source words to the desired target words.
     For that open and free available LLMs/GPTs are used to perform the translation.
+    The translator is a shared engine, the languages and the model are passed with every translation.
     """
 
     __slots__ = (
-        'source_language',
-        'target_language',
-        'endofs',
-        'quotes',
-        'model_name',
         'model_temp',
         'model_seed',
+        'api_url',
         '_client',
-        'models',
+        '_async_client',
+        '_catalog',
     )
 
     PROMPT: str = ''
+    PROMPT_VERSION: str = ''
+    # the prompt extension for the combined mode with free sentence translations
+    PROMPT_SENTENCES: str = ''
+    PROMPT_SENTENCES_VERSION: str = ''
+
+    _executor: ThreadPoolExecutor = ThreadPoolExecutor(
+        max_workers = CONFIG.neural_workers, thread_name_prefix = 'NeuralTranslator')
+    _scheduler: JobScheduler = JobScheduler(name = 'NeuralTranslator', workers = CONFIG.neural_workers)
+    # the identical batches of the sessions decoding the same text are sent only once
+    _flights: SingleFlight = SingleFlight(name = 'NeuralTranslator')
+    _memory: TranslationMemory = TranslationMemory()
+    # the failed requests, of which the rate limited and the transient ones are retried by the rate limiter
+    _errors: tuple[type[Exception], ...] = (APIConnectionError, APIStatusError)
 
     def __init__(self,
-                 model_name: str = None,
-                 source_language: str = 'auto',
-                 target_language: str = 'english',
                  proxies: dict = None,
-                 endofs: str = CONFIG.Regex.endofs,
-                 quotes: str = CONFIG.Regex.quotes,
                  model_temp: float = CONFIG.model_temp,
                  model_seed: int = CONFIG.model_seed,
                  api_url: str = CONFIG.api_url,
                  api_key: str = CONFIG.api_key) -> None:
         """
-        :param model_name: LLM/GPT model name
-        :param source_language: the translation source language
-        :param target_language: the translation target language
         :param proxies: set proxies for translator
-        :param endofs: end of sentence characters to split sentences
-        :param quotes: quote characters to split sentences
         :param model_temp: model temperature to adapt model 'creativity' and 'determinism'
         :param model_seed: model seed to adapt 'determinism'
         :param api_url: api url to model site
         :param api_key: api key to get access
         """
-        self.model_name = model_name
-        self.source_language = source_language
-        self.target_language = target_language
         self.model_temp = model_temp
         self.model_seed = model_seed
-        self.endofs = endofs
-        self.quotes = quotes
+        self.api_url = api_url
         if not NeuralTranslator.PROMPT:
             NeuralTranslator.PROMPT = self._load_prompt()
+            NeuralTranslator.PROMPT_VERSION = hashlib.sha256(NeuralTranslator.PROMPT.encode()).hexdigest()[:16]
+        # the prompt extension is only needed and loaded in combined mode
+        if CONFIG.combined_mode and not NeuralTranslator.PROMPT_SENTENCES:
+            NeuralTranslator.PROMPT_SENTENCES = self._load_prompt(prompt_path = 'prompt_sentences.txt')
+            NeuralTranslator.PROMPT_SENTENCES_VERSION = hashlib.sha256(
+                (NeuralTranslator.PROMPT + NeuralTranslator.PROMPT_SENTENCES).encode()).hexdigest()[:16]
+        # keep-alive connection pools for the sync and async requests
+        #   the rate limited and transiently failed requests are retried by the shared rate limiter instead of the
+        #   client, so a rate limit blocks the requests of all sessions
         self._client = openai.OpenAI(
             base_url = api_url,
             api_key = self._decode_key(api_key),
+            max_retries = 0,
+            http_client = httpx.Client(mounts = utils.get_mounts(proxies))
+        )
+        self._async_client = openai.AsyncOpenAI(
+            base_url = api_url,
+            api_key = self._decode_key(api_key),
+            max_retries = 0,
+            http_client = httpx.AsyncClient(mounts = utils.get_mounts(proxies, httpx.AsyncHTTPTransport))
         )
-        self._set_proxy(proxies = proxies)
-        self.models = self.get_available_models()
-        if self.model_name is None:
-            self.model_name = list(self.models.keys())[0]
-
-    def __config__(self, source_language: str, target_language: str, model_name: str,
-                   proxies: dict = None, endofs: str = '', quotes: str = '') -> None:
-        self.source_language = source_language
-        self.target_language = target_language
-        self.model_name = model_name
-        self._set_proxy(proxies = proxies)
-        if endofs: self.endofs = endofs
-        if quotes: self.quotes = quotes
-
-    def _set_proxy(self, proxies: dict = None) -> None:
-        if isinstance(proxies, dict):
-            if proxies.get('http', ''):
-                proxies.update({'http://': httpx.HTTPTransport(proxy = f'http://{proxies.get("http")}')})
-            if proxies.get('https', ''):
-                proxies.update({'https://': httpx.HTTPTransport(proxy = f'http://{proxies.get("https")}')})
-            proxies.pop('http', None)
-            proxies.pop('https', None)
-        self._client._client = httpx.Client(mounts = proxies)
+        self._catalog = ModelCatalog.get_catalog(api_url = api_url, api_key = self._decode_key(api_key))
+
+    @property
+    def models(self) -> dict[str, str]:
+        return self.get_available_models()
+
+    def get_model_info(self, model_name: str) -> ModelInfo:
+        return self._catalog.models.get(model_name)
 
     def get_available_models(self) -> dict[str, str]:
-        time_date = time.time() - CONFIG.model_age * 2592000  # 30d * 24h * 3600s per months
-        models = [
-            model for model in self._client.models.list().data
-            if ':free' in model.id and model.created >= time_date
-               and model.context_length >= CONFIG.model_context
-               and {'text'}.issubset(model.architecture.get('input_modalities'))
-               and {'text'}.issubset(model.architecture.get('output_modalities'))
-               and {'temperature'}.issubset(model.supported_parameters)  # seed
-            # and {'reasoning', 'include_reasoning'}.isdisjoint(model.supported_parameters)
-
-        ]
-        models.sort(key = lambda model: model.name)
-        return {model.name.removesuffix('(free)').strip(): model.id for model in models}
-
-    def translate_batch(self, source_words: list[str]) -> list[str]:
-        result = []
-        for batch in utils.yield_batch_eos(source_words, char_limit = CONFIG.char_limit,
-                                           endofs = self.endofs, quotes = self.quotes):
-            result.extend(self._translate(batch))
+        return {name: info.id for name, info in self._catalog.models.items()}
+
+    def _get_estimator(self, model_name: str) -> TokenEstimator:
+        return TokenEstimator.get_estimator(model_id = self.models.get(model_name, model_name))
+
+    def _get_limiter(self, model_name: str) -> RateLimiter:
+        # the requests of all sessions to the provider are spaced out per model
+        return RateLimiter.get_limiter(provider = self.api_url, model = self.models.get(model_name, model_name),
+                                       rate = CONFIG.neural_rate, capacity = CONFIG.neural_workers)
+
+    def _get_sizer(self, model_name: str) -> BatchSizer:
+        # the token budget is shared by all users of the model, the longer combined prompt is assumed if enabled
+        return BatchSizer.get_sizer(
+            model_id = self.models.get(model_name, model_name),
+            info = self.get_model_info(model_name),
+            prompt_tokens = self._get_estimator(model_name).count_text(f'{self.PROMPT}\n{self.PROMPT_SENTENCES}')
+        )
+
+    def _get_sentences(self, source_words: list[str], source_language: str, target_language: str,
+                       model_name: str, endofs: str, quotes: str, eos_indices: Optional[Sequence[int]],
+                       combined: bool = False) -> list[tuple[int, int, str]]:
+        # the range and the memory key of every sentence
+        model_id = self.models.get(model_name, model_name)
+        prompt_version = self.PROMPT_SENTENCES_VERSION if combined else self.PROMPT_VERSION
+        return [(start, stop, self._memory.get_key(model_id, source_language, target_language,
+                                                   prompt_version, source_words[start:stop]))
+                for start, stop in utils.yield_sentences(source_words, endofs, quotes, eos_indices = eos_indices)]
+
+    def _get_pending(self, targets: list[Optional[str]], sentences: list[tuple[int, int, str]],
+                     found: dict[str, list[str]]) -> list[tuple[int, int, str]]:
+        # serve the sentences found in the translation memory and return the missing ones
+        pending = []
+        for start, stop, key in sentences:
+            memorized = found.get(key)
+            if memorized is not None and len(memorized) == stop - start:
+                targets[start:stop] = memorized
+            else:
+                pending.append((start, stop, key))
+        logger.info(f'Translate {len(pending)} sentences not found in memory {self._memory.get_stats()}.')
+        return pending
+
+    @staticmethod
+    def _get_batches(source_words: list[str], pending: list[tuple[int, int, str]], token_limit: int,
+                     count: Callable[[str], int]) -> tuple[list[list[str]], list[int], list[int]]:
+        # positions of the missing words in the source words and the offset of every batch in the positions
+        positions = [i for start, stop, _ in pending for i in range(start, stop)]
+        words = [source_words[i] for i in positions]
+        # the pending words are complete sentences, so their boundaries follow from the sentence lengths
+        eos_indices = list(itertools.accumulate(stop - start for start, stop, _ in pending))
+        # every word is a row of the CSV with a new line as separator
+        ranges = list(utils.yield_range_eos(words, char_limit = token_limit, eos_indices = eos_indices, size = count))
+        return [words[start:stop] for start, stop in ranges], positions, [start for start, _ in ranges]
+
+    def _pop_sentences(self, source_words: list[str], targets: list[Optional[str]],
+                       pending: list[tuple[int, int, str]], cells: Optional[list[Optional[str]]] = None,
+                       sentences: Optional[dict[str, str]] = None
+                       ) -> tuple[list[tuple[int, list[str]]], list[tuple[str, list[str]]]]:
+        # return the sentences with all target words translated and the ones to memorize
+        ready, waiting, memorized = [], [], []
+        for start, stop, key in pending:
+            if any(target is None for target in targets[start:stop]):
+                waiting.append((start, stop, key))
+                continue
+            # an untranslated fallback is not memorized
+            if targets[start:stop] != source_words[start:stop]:
+                memorized.append((key, targets[start:stop]))
+            # in combined mode the free translation is in the sentence cell of the last word
+            if sentences is not None and cells[stop - 1]:
+                sentences[' '.join(source_words[start:stop])] = cells[stop - 1]
+            ready.append((start, targets[start:stop]))
+        pending[:] = waiting
+        return ready, memorized
+
+    @staticmethod
+    def _set_targets(targets: list[Optional[str]], cells: Optional[list[Optional[str]]],
+                     positions: list[int], batch_targets: list[Union[str, tuple[str, str]]]) -> None:
+        for i, target in zip(positions, batch_targets):
+            # in combined mode every target comes with its sentence cell
+            if cells is not None: target, cells[i] = target
+            targets[i] = target
+
+    def translate_batch(self, source_words: list[str], source_language: str, target_language: str,
+                        model_name: str, endofs: str = CONFIG.Regex.endofs, quotes: str = CONFIG.Regex.quotes,
+                        eos_indices: Optional[Sequence[int]] = None,
+                        sentences: Optional[dict[str, str]] = None) -> list[str]:
+        """
+        :param sentences: enables the combined mode, which fills the free translations of the sentences
+            by their source sentence in the same requests
+        """
+        combined = sentences is not None
+        targets: list[Optional[str]] = [None] * len(source_words)
+        cells: Optional[list[Optional[str]]] = [None] * len(source_words) if combined else None
+        sentence_keys = self._get_sentences(source_words, source_language, target_language,
+                                            model_name, endofs, quotes, eos_indices, combined)
+        # all sentences are looked up at once, so the memory is not queried and committed per sentence
+        found = self._memory.get_many([key for _, _, key in sentence_keys])
+        pending = self._get_pending(targets, sentence_keys, found)
+        batches, positions, offsets = self._get_batches(
+            source_words, pending, self._get_sizer(model_name).limit, self._get_estimator(model_name).count)
+        translate = functools.partial(self._translate, source_language = source_language,
+                                      target_language = target_language, model_name = model_name,
+                                      combined = combined)
+        for offset, batch_targets in zip(offsets, utils.map_batches(translate, batches, self._executor)):
+            self._set_targets(targets, cells, positions[offset:], batch_targets)
+        _, memorized = self._pop_sentences(source_words, targets, pending, cells, sentences)
+        self._memory.set_many(memorized)
+        return targets
+
+    async def translate_batch_async(self, source_words: list[str], source_language: str, target_language: str,
+                                    model_name: str, endofs: str = CONFIG.Regex.endofs,
+                                    quotes: str = CONFIG.Regex.quotes,
+                                    eos_indices: Optional[Sequence[int]] = None,
+                                    sentences: Optional[dict[str, str]] = None, user: str = '') -> list[str]:
+        result = list(source_words)
+        async for start, targets in self.iter_translate_async(source_words, source_language, target_language,
+                                                              model_name, endofs = endofs, quotes = quotes,
+                                                              eos_indices = eos_indices, sentences = sentences,
+                                                              user = user):
+            result[start:start + len(targets)] = targets
         return result
 
-    def _translate(self, source_words: list[str]) -> list[str]:
-        try:
-            logger.info(f'Translate words with: {self.model_name}')
-            response = self._client.chat.completions.create(
-                messages = [
-                    ChatCompletionSystemMessageParam(role = 'system', content = self._get_prompt()),
-                    ChatCompletionUserMessageParam(role = 'user', content = self._to_csv(source_words))
-                    # ChatCompletionAssistantMessageParam(content = 'Source\tTarget\n')
-                ],
-                model = self.models.get(self.model_name),
-                temperature = self.model_temp,
-                # top_k = 10,
-                # top_p = 0.5,
-                # frequency_penalty = 0.0,  # + for frequent word penalty
-                seed = self.model_seed,
-                extra_headers = {
-                    "X-Title": "LanguageDecoder",
-                    # "HTTP-Referer": "LanguageDecoder",
-                },
-            )
-            if not response.choices[0].message.content: return source_words
+    async def iter_translate_async(self, source_words: list[str], source_language: str, target_language: str,
+                                   model_name: str, endofs: str = CONFIG.Regex.endofs,
+                                   quotes: str = CONFIG.Regex.quotes, eos_indices: Optional[Sequence[int]] = None,
+                                   sentences: Optional[dict[str, str]] = None, user: str = ''
+                                   ) -> AsyncIterator[tuple[int, list[str]]]:
+        combined = sentences is not None
+        targets: list[Optional[str]] = [None] * len(source_words)
+        cells: Optional[list[Optional[str]]] = [None] * len(source_words) if combined else None
+        if eos_indices is None:
+            eos_indices = utils.get_eos_indices(source_words, endofs = endofs, quotes = quotes)
+        sentence_keys = self._get_sentences(source_words, source_language, target_language,
+                                            model_name, endofs, quotes, eos_indices, combined)
+        # the sqlite queries and commits of the memory run off the event loop, so they do not block other sessions
+        found = await asyncio.to_thread(self._memory.get_many, [key for _, _, key in sentence_keys])
+        pending = self._get_pending(targets, sentence_keys, found)
+        # the memorized sentences are yielded first
+        for start, stop in utils.yield_sentences(source_words, eos_indices = eos_indices):
+            if targets[start] is not None:
+                yield start, targets[start:stop]
+        batches, positions, offsets = self._get_batches(
+            source_words, pending, self._get_sizer(model_name).limit, self._get_estimator(model_name).count)
+        # the batches of all users are interleaved round-robin by the scheduler
+        translate = functools.partial(self._translate_async, source_language = source_language,
+                                      target_language = target_language, model_name = model_name,
+                                      combined = combined, slot = self._scheduler.get_slot(user))
+        async for index, batch_targets in utils.iter_batches(translate, batches):
+            self._set_targets(targets, cells, positions[offsets[index]:], batch_targets)
+            ready, memorized = self._pop_sentences(source_words, targets, pending, cells, sentences)
+            # the finished sentences of a batch are memorized in one transaction
+            if memorized: await asyncio.to_thread(self._memory.set_many, memorized)
+            for start, sentence_targets in ready:
+                yield start, sentence_targets
 
-            return self._check_content(
-                content = response.choices[0].message.content,
-                csv_len = len(source_words) + 1
-            )
+    def _get_request(self, source_words: list[str], source_language: str, target_language: str,
+                     model_name: str, combined: bool = False) -> dict:
+        return dict(
+            messages = [
+                ChatCompletionSystemMessageParam(
+                    role = 'system', content = self._get_prompt(source_language, target_language, combined)),
+                ChatCompletionUserMessageParam(role = 'user', content = self._to_csv(source_words, combined))
+                # ChatCompletionAssistantMessageParam(content = 'Source\tTarget\n')
+            ],
+            model = self.models.get(model_name),
+            temperature = self.model_temp,
+            # top_k = 10,
+            # top_p = 0.5,
+            # frequency_penalty = 0.0,  # + for frequent word penalty
+            seed = self.model_seed,
+            extra_headers = {
+                "X-Title": "LanguageDecoder",
+                # "HTTP-Referer": "LanguageDecoder",
+            },
+        )
+
+    def _get_targets(self, response: ChatCompletion, source_words: list[str],
+                     combined: bool = False) -> list[Optional[Union[str, tuple[str, str]]]]:
+        # in combined mode the target words are returned with their sentence cells
+        #   the target of a source word without a matching row is None
+        if not response.choices[0].message.content: return [None] * len(source_words)
+        rows = self._check_content(content = response.choices[0].message.content, source_words = source_words)
+        if not combined: return [None if row is None else row[-1] for row in rows]
+        return [None if row is None else (row[1] if len(row) > 1 else row[-1], row[2] if len(row) > 2 else '')
+                for row in rows]
+
+    def _check_response(self, request: dict, response: ChatCompletion, source_words: list[str], model_name: str,
+                        combined: bool) -> list[Optional[Union[str, tuple[str, str]]]]:
+        targets = self._get_targets(response = response, source_words = source_words, combined = combined)
+        estimator = self._get_estimator(model_name)
+        # the reported prompt tokens without the system prompt calibrate the estimate of the CSV
+        usage = getattr(response, 'usage', None)
+        if usage and usage.prompt_tokens:
+            system, user = (message['content'] for message in request['messages'])
+            estimator.calibrate(text = user, tokens = usage.prompt_tokens - estimator.count_text(system))
+        # a reply cut off at the completion tokens or with unmatched rows shrinks the batches of the model
+        clean = response.choices[0].finish_reason != 'length' and None not in targets
+        tokens = sum(map(estimator.count, source_words)) + len(source_words)
+        self._get_sizer(model_name).update(tokens = tokens, clean = clean)
+        return targets
+
+    @staticmethod
+    def _get_missing(targets: list[Optional[Union[str, tuple[str, str]]]]) -> list[int]:
+        return [i for i, target in enumerate(targets) if target is None]
+
+    @staticmethod
+    def _set_retried(targets: list[Optional[Union[str, tuple[str, str]]]], missing: list[int],
+                     retried: list[Optional[str]], combined: bool) -> None:
+        # the retried words are out of their sentences, so they get no sentence cells in combined mode
+        for i, target in zip(missing, retried):
+            if target is not None: targets[i] = (target, '') if combined else target
+
+    @staticmethod
+    def _get_fallback(targets: list[Optional[Union[str, tuple[str, str]]]], source_words: list[str],
+                      combined: bool, retries: int) -> list[Union[str, tuple[str, str]]]:
+        # the words without a translation after all retries keep the source word, which is not memorized
+        missing = sum(target is None for target in targets)
+        if retries or missing:
+            logger.warning(f'Batch of {len(source_words)} words retried {retries} times, '
+                           f'{missing} words are not translated.')
+        fallback = (lambda word: (word, '')) if combined else (lambda word: word)
+        return [fallback(word) if target is None else target for word, target in zip(source_words, targets)]
+
+    def _request(self, source_words: list[str], source_language: str, target_language: str,
+                 model_name: str, combined: bool) -> list[Optional[Union[str, tuple[str, str]]]]:
+        logger.info(f'Translate words with: {model_name}')
+        request = self._get_request(source_words, source_language, target_language, model_name, combined)
+        response = self._get_limiter(model_name).call(
+            functools.partial(self._client.chat.completions.create, **request), errors = self._errors)
+        return self._check_response(request, response, source_words, model_name, combined)
+
+    async def _request_async(self, source_words: list[str], source_language: str, target_language: str,
+                             model_name: str, combined: bool) -> list[Optional[Union[str, tuple[str, str]]]]:
+        logger.info(f'Translate words with: {model_name}')
+        request = self._get_request(source_words, source_language, target_language, model_name, combined)
+        response = await self._get_limiter(model_name).call_async(
+            functools.partial(self._async_client.chat.completions.create, **request), errors = self._errors)
+        return self._check_response(request, response, source_words, model_name, combined)
+
+    def _get_flight_key(self, source_words: list[str], source_language: str, target_language: str,
+                        model_name: str, combined: bool) -> tuple:
+        return (self.api_url, self.models.get(model_name, model_name), source_language, target_language,
+                combined, get_batch_hash(source_words))
+
+    def _translate(self, source_words: list[str], source_language: str, target_language: str,
+                   model_name: str, combined: bool = False) -> list[Union[str, tuple[str, str]]]:
+        key = self._get_flight_key(source_words, source_language, target_language, model_name, combined)
+        return self._flights.call(key, functools.partial(
+            self._translate_retried, source_words, source_language, target_language, model_name, combined))
+
+    async def _translate_async(self, source_words: list[str], source_language: str, target_language: str,
+                               model_name: str, combined: bool = False,
+                               slot: Optional[JobSlot] = None) -> list[Union[str, tuple[str, str]]]:
+        key = self._get_flight_key(source_words, source_language, target_language, model_name, combined)
+        return await self._flights.call_async(key, functools.partial(
+            self._translate_retried_async, source_words, source_language, target_language, model_name, combined),
+            slot = slot)
+
+    def _translate_retried(self, source_words: list[str], source_language: str, target_language: str,
+                           model_name: str, combined: bool) -> list[Union[str, tuple[str, str]]]:
+        with self._handle_errors():
+            targets = self._request(source_words, source_language, target_language, model_name, combined)
+            retries = 0
+            # only the words without a matching row are requested again as a smaller batch without sentences
+            while (missing := self._get_missing(targets)) and retries < CONFIG.batch_retries:
+                retries += 1
+                retried = self._request([source_words[i] for i in missing], source_language, target_language,
+                                        model_name, combined = False)
+                self._set_retried(targets, missing, retried, combined)
+            return self._get_fallback(targets, source_words, combined, retries)
+
+    async def _translate_retried_async(self, source_words: list[str], source_language: str, target_language: str,
+                                       model_name: str, combined: bool) -> list[Union[str, tuple[str, str]]]:
+        with self._handle_errors():
+            targets = await self._request_async(source_words, source_language, target_language, model_name, combined)
+            retries = 0
+            # only the words without a matching row are requested again as a smaller batch without sentences
+            while (missing := self._get_missing(targets)) and retries < CONFIG.batch_retries:
+                retries += 1
+                retried = await self._request_async([source_words[i] for i in missing], source_language,
+                                                    target_language, model_name, combined = False)
+                self._set_retried(targets, missing, retried, combined)
+            return self._get_fallback(targets, source_words, combined, retries)
+
+    @staticmethod
+    @contextmanager
+    def _handle_errors() -> Iterator[None]:
+        try:
+            yield
         except ProxyError as exception:
             message = 'Proxy Error! Check your proxy settings!'
             logger.error(f'{message} with exception: {exception}\n{traceback.format_exc()}')
@@ -166,19 +422,40 @@ class NeuralTranslator(object):
             logger.error(f'{message} with exception: {exception}\n{traceback.format_exc()}')
             raise NeuralTranslatorError(message, code = exception.status_code)
 
-    def _check_content(self, content: str, csv_len: int) -> list[str]:
+    @staticmethod
+    def _get_core(word: str) -> str:
+        # the echoed source words may differ in quotes, escapes and punctuations
+        prefix, core, _ = split_affixes(word)
+        return core if core else prefix
+
+    def _check_content(self, content: str, source_words: list[str]) -> list[Optional[list[str]]]:
+        """
+        Align the rows of the response to the source words by the echoed source column,
+        so a missing or an additional row does not shift the following rows.
+
+        :param content: the tab-separated CSV content of the response
+        :param source_words: the source words of the request
+        :return: the row of every source word, None if no row matches the source word
+        """
         # get only valid rows
         valid_rows = [row for row in content.split('\n') if '\t' in row]
         # if the first row does not start with 'Source\tTarget' then add it
         if not valid_rows or not valid_rows[0].startswith('Source\tTarget'):
             valid_rows.insert(0, 'Source\tTarget')
-        # ensure, that the list is as long as the input
-        valid_rows.extend([valid_rows[-1]] * (csv_len - len(valid_rows)))
-        # ensure, that the list is max length of the input
-        return self._from_csv('\n'.join(valid_rows[:csv_len]))
+        rows = self._from_csv('\n'.join(valid_rows))
+        matcher = difflib.SequenceMatcher(
+            None, list(map(self._get_core, source_words)), [self._get_core(row[0]) for row in rows],
+            autojunk = False)
+        aligned: list[Optional[list[str]]] = [None] * len(source_words)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            # rows with a differently echoed source word are taken by position, if the number of words is equal
+            if tag == 'equal' or (tag == 'replace' and i2 - i1 == j2 - j1):
+                aligned[i1:i2] = rows[j1:j2]
+        return aligned
 
-    def _get_prompt(self) -> str:
-        return self.PROMPT.replace('<SOURCE>', self.source_language).replace('<TARGET>', self.target_language)
+    def _get_prompt(self, source_language: str, target_language: str, combined: bool = False) -> str:
+        prompt = f'{self.PROMPT}\n{self.PROMPT_SENTENCES}' if combined else self.PROMPT
+        return prompt.replace('<SOURCE>', source_language).replace('<TARGET>', target_language)
 
     @staticmethod
     def _encode_key(api_key: str) -> str:
@@ -189,7 +466,7 @@ class NeuralTranslator(object):
         return base64.b64decode(api_key.encode()).decode()
 
     @staticmethod
-    def _to_csv(source_words: list[str]) -> str:
+    def _to_csv(source_words: list[str], combined: bool = False) -> str:
         with io.StringIO() as io_string:
             csv_writer = csv.writer(
                 io_string,
@@ -198,13 +475,14 @@ class NeuralTranslator(object):
                 lineterminator = '\n',
                 quoting = csv.QUOTE_NONE
             )
-            csv_writer.writerows([('Source', 'Target')] + list(zip(source_words)))
+            header = ('Source', 'Target', 'Sentence') if combined else ('Source', 'Target')
+            csv_writer.writerows([header] + list(zip(source_words)))
             return io_string.getvalue()
 
     @staticmethod
-    def _from_csv(csv_string: str) -> list[str]:
+    def _from_csv(csv_string: str) -> list[list[str]]:
         with io.StringIO(csv_string) as io_string:
-            return [row[-1] for row in csv.reader(io_string, delimiter = '\t')][1:]
+            return list(csv.reader(io_string, delimiter = '\t'))[1:]
 
     @classmethod
     def _load_prompt(cls, prompt_path: str = 'prompt.txt') -> str:
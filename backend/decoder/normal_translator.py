@@ -1,74 +1,189 @@
+import asyncio
+import functools
 import traceback
-from typing import Optional
+from typing import AsyncIterator, Iterator, Optional
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pprint import PrettyPrinter
 from requests.exceptions import ConnectionError as HTTPConnectionError, ProxyError
-from deep_translator.exceptions import BaseError, RequestError, TooManyRequests
+from deep_translator.exceptions import BaseError, RequestError, TooManyRequests, TranslationNotFound
 from deep_translator import GoogleTranslator
 from backend.error.error import NormalTranslatorError
 from backend.logger.logger import logger
 from backend.config.config import CONFIG
+from backend.decoder.engine import Engine
+from backend.decoder.rate_limiter import RateLimiter
+from backend.decoder.job_scheduler import JobScheduler, JobSlot
+from backend.decoder.single_flight import SingleFlight, get_batch_hash
 from backend.utils import utilities as utils
 
 GOOGLE_TRANSLATOR = 'Google Translator'
 
 
-class NormalTranslator(object):
+class NormalTranslator(Engine):
     """
     NormalTranslator is used to provide a simple interface for normal translators like GoogleTranslator.
+    Translations are cached process-wide per (source language, target language, word),
+    so only unseen words are sent to the translator. Detected source languages are not cached.
+    The translator is a shared engine, the languages are passed with every translation.
     """
 
     __slots__ = (
         '_translator',
-        'endofs',
-        'quotes',
+        '_proxies',
     )
 
-    def __init__(self,
-                 source_language: str = 'auto',
-                 target_language: str = 'english',
-                 proxies: Optional[dict] = None,
-                 endofs: str = CONFIG.Regex.endofs,
-                 quotes: str = CONFIG.Regex.quotes,
-                 **kwargs) -> None:
+    _cache: utils.LRUCache = utils.LRUCache(max_size = CONFIG.cache_size)
+    _executor: ThreadPoolExecutor = ThreadPoolExecutor(
+        max_workers = CONFIG.normal_workers, thread_name_prefix = 'NormalTranslator')
+    _scheduler: JobScheduler = JobScheduler(name = GOOGLE_TRANSLATOR, workers = CONFIG.normal_workers)
+    # the requests of all sessions to the Google endpoint are spaced out by one limiter
+    _limiter: RateLimiter = RateLimiter.get_limiter(
+        provider = GOOGLE_TRANSLATOR, rate = CONFIG.normal_rate, capacity = CONFIG.normal_workers)
+    # the identical batches of the sessions decoding the same text are sent only once
+    _flights: SingleFlight = SingleFlight(name = GOOGLE_TRANSLATOR)
+
+    def __init__(self, proxies: Optional[dict] = None) -> None:
         """
-        :param source_language: the translation source language
-        :param target_language: the translation target language
         :param proxies: set proxies for translator
-        :param endofs: end of sentence characters to split sentences
-        :param quotes: quote characters to split sentences
         """
-        self._translator = GoogleTranslator(
-            source = source_language,
-            target = target_language,
-            proxies = proxies,
-            **kwargs
-        )
-        self.endofs = endofs
-        self.quotes = quotes
-
-    def __config__(self, source_language: str, target_language: str,
-                   proxies: Optional[dict] = None, endofs: str = '', quotes: str = '') -> None:
-        self._translator.source, self._translator.target = self._translator._map_language_to_code(  # noqa
-            source_language, target_language)
-        self._translator.proxies = proxies
-        if endofs: self.endofs = endofs
-        if quotes: self.quotes = quotes
+        self._translator = GoogleTranslator(proxies = proxies)
+        self._proxies = proxies
+
+    def _get_languages(self, source_language: str, target_language: str) -> tuple[str, str]:
+        # the mapping of the public API yields the codes, which are part of the cache and flight keys
+        with self._handle_errors():
+            return tuple(self._translator._map_language_to_code(source_language, target_language))  # noqa
 
     def get_supported_languages(self, show: bool = False) -> list[str]:
         languages = self._translator.get_supported_languages(as_dict = True)
         if show: PrettyPrinter(indent = 4).pprint(languages.keys())
         return list(languages.keys())
 
-    def translate_batch(self, source_words: list[str]) -> list[str]:
-        result = []
-        for batch in utils.yield_batch_eos(source_words, char_limit = CONFIG.char_limit,
-                                           endofs = self.endofs, quotes = self.quotes):
-            result.extend(self._translate(batch))
+    @staticmethod
+    def _is_cacheable(languages: tuple[str, str], cache: bool) -> bool:
+        # a word of a detected source language may be a homograph of a word of another language
+        return cache and languages[0] != 'auto'
+
+    def _get_cached(self, source_words: list[str], languages: tuple[str, str],
+                    cache: bool = True) -> tuple[dict[str, str], list[str]]:
+        # without the cache, e.g. for sentences, only the duplicates are removed
+        if not cache: return {}, list(dict.fromkeys(source_words))
+        translations: dict[str, str] = {}
+        for word in dict.fromkeys(source_words):
+            target = self._cache.get((*languages, word))
+            if target is not None: translations[word] = target
+        # only unique and not yet translated words are sent to the translator
+        unseen_words = [word for word in dict.fromkeys(source_words) if word not in translations]
+        logger.info(f'Translate {len(unseen_words)} unseen of {len(source_words)} words.')
+        return translations, unseen_words
+
+    def _set_cached(self, translations: dict[str, str], batches: list[list[str]],
+                    results: list[list[str]], languages: tuple[str, str], cache: bool = True) -> None:
+        for batch, targets in zip(batches, results):
+            if len(targets) != len(batch):
+                message = (f'Length mismatch between source words ({len(batch)}) '
+                           f'and target words ({len(targets)})!')
+                logger.error(message)
+                raise NormalTranslatorError(message, code = 500)
+            for word, target in zip(batch, targets):
+                translations[word] = target
+                if cache: self._cache.set((*languages, word), target)
+
+    def translate_batch(self, source_words: list[str], source_language: str, target_language: str,
+                        cache: bool = True) -> list[str]:
+        """
+        :param cache: False for texts, which are not single words, e.g. sentences, to keep them out of the word cache
+        """
+        languages = self._get_languages(source_language, target_language)
+        cache = self._is_cacheable(languages, cache)
+        translations, unseen_words = self._get_cached(source_words, languages = languages, cache = cache)
+        batches = list(utils.yield_batch(unseen_words, char_limit = CONFIG.char_limit))
+        translate = functools.partial(self._translate, languages = languages)
+        results = utils.map_batches(translate, batches, self._executor)
+        self._set_cached(translations = translations, batches = batches, results = results, languages = languages,
+                         cache = cache)
+        # splice the translations back in the order of the source words
+        return [translations.get(word) for word in source_words]
+
+    async def translate_batch_async(self, source_words: list[str], source_language: str,
+                                    target_language: str, user: str = '', cache: bool = True) -> list[str]:
+        result = list(source_words)
+        async for start, targets in self.iter_translate_async(source_words, source_language, target_language,
+                                                              user = user, cache = cache):
+            result[start:start + len(targets)] = targets
         return result
 
-    def _translate(self, source_words: list[str]) -> list[str]:
+    async def iter_translate_async(self, source_words: list[str], source_language: str,
+                                   target_language: str, user: str = '',
+                                   cache: bool = True) -> AsyncIterator[tuple[int, list[str]]]:
+        languages = self._get_languages(source_language, target_language)
+        cache = self._is_cacheable(languages, cache)
+        translations, unseen_words = self._get_cached(source_words, languages = languages, cache = cache)
+        batches = list(utils.yield_batch(unseen_words, char_limit = CONFIG.char_limit))
+        # source ranges are yielded as soon as all of their words are translated
+        ranges, start = [], 0
+        for source_batch in utils.yield_batch(source_words, char_limit = CONFIG.char_limit):
+            ranges.append((start, source_batch))
+            start += len(source_batch)
+        for start, targets in self._pop_ranges(ranges = ranges, translations = translations):
+            yield start, targets
+        # the batches of all users are interleaved round-robin by the scheduler
+        translate = functools.partial(self._translate_async, languages = languages,
+                                      slot = self._scheduler.get_slot(user))
+        async for index, targets in utils.iter_batches(translate, batches):
+            self._set_cached(translations = translations, batches = [batches[index]],
+                             results = [targets], languages = languages, cache = cache)
+            for start, range_targets in self._pop_ranges(ranges = ranges, translations = translations):
+                yield start, range_targets
+
+    @staticmethod
+    def _pop_ranges(ranges: list[tuple[int, list[str]]],
+                    translations: dict[str, str]) -> list[tuple[int, list[str]]]:
+        ready, pending = [], []
+        for start, words in ranges:
+            (ready if all(word in translations for word in words) else pending).append((start, words))
+        ranges[:] = pending
+        return [(start, [translations.get(word) for word in words]) for start, words in ready]
+
+    def _request(self, text: str, languages: tuple[str, str]) -> list[str]:
+        # one translator per request, as the public API keeps the languages in the translator
+        translator = GoogleTranslator(source = languages[0], target = languages[1], proxies = self._proxies)
+        targets = translator.translate(text)
+        if targets is None: raise TranslationNotFound(text)
+        return targets.split('\n')
+
+    async def _request_async(self, text: str, languages: tuple[str, str]) -> list[str]:
+        # the public API is blocking, so its requests run in the bounded workers off the event loop
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(self._request, text, languages))
+
+    @staticmethod
+    def _get_flight_key(text: str, languages: tuple[str, str]) -> tuple[str, str, str, str]:
+        return GOOGLE_TRANSLATOR, *languages, get_batch_hash([text])
+
+    def _translate(self, source_words: list[str], languages: tuple[str, str]) -> list[str]:
+        text = '\n'.join(source_words).strip()
+        if languages[0] == languages[1] or not text: return source_words
+        request = functools.partial(self._request, text, languages)
+        with self._handle_errors():
+            return self._flights.call(self._get_flight_key(text, languages), functools.partial(
+                self._limiter.call, request, errors = (TooManyRequests,)))
+
+    async def _translate_async(self, source_words: list[str], languages: tuple[str, str],
+                               slot: Optional[JobSlot] = None) -> list[str]:
+        text = '\n'.join(source_words).strip()
+        if languages[0] == languages[1] or not text: return source_words
+        request = functools.partial(self._request_async, text, languages)
+        with self._handle_errors():
+            return await self._flights.call_async(self._get_flight_key(text, languages), functools.partial(
+                self._limiter.call_async, request, errors = (TooManyRequests,)), slot = slot)
+
+    @staticmethod
+    @contextmanager
+    def _handle_errors() -> Iterator[None]:
         try:
-            return self._translator.translate('\n'.join(source_words)).split('\n')
+            yield
         except ProxyError as exception:
             message = 'Proxy Error! Check your proxy settings!'
             logger.error(f'{message} with exception: {exception}\n{traceback.format_exc()}')
@@ -0,0 +1,169 @@
+import time
+import random
+import asyncio
+import threading
+import itertools
+from typing import Awaitable, Callable, Optional, TypeVar
+from deep_translator.exceptions import TooManyRequests
+from backend.logger.logger import logger
+from backend.config.config import CONFIG
+
+T = TypeVar('T')
+
+
+def get_retry_after(exception: Exception) -> Optional[float]:
+    """
+    Args:
+        exception: the rate limit exception, which may have the response of the provider
+    Returns:
+        the seconds of the Retry-After header, None if the header is missing or not in seconds
+    """
+    headers = getattr(getattr(exception, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limit(exception: Exception) -> bool:
+    # the Google translator raises TooManyRequests without a status code
+    return isinstance(exception, TooManyRequests) or getattr(exception, 'status_code', None) == 429
+
+
+def is_transient(exception: Exception) -> bool:
+    """
+    Args:
+        exception: the exception of a failed request
+    Returns:
+        True for a connection error, a timeout, a conflict, a rate limit or a server error, which may pass on retry
+    """
+    status_code = getattr(exception, 'status_code', None)
+    return status_code is None or status_code in (408, 409, 429) or status_code >= 500
+
+
+class RateLimiter(object):
+    """
+    The RateLimiter is a process-wide token bucket per upstream provider and model shared by all sessions.
+    Every request reserves a token, so the requests of all sessions are spaced out in the order of arrival.
+    A rate limited request blocks the bucket for the Retry-After time or an exponential backoff and is retried.
+    Other transient errors, e.g. connection errors or server errors, are retried with a backoff of the request only.
+    """
+
+    __slots__ = (
+        'name',
+        'rate',
+        'capacity',
+        '_tokens',
+        '_updated',
+        '_blocked',
+        '_lock'
+    )
+
+    _limiters: dict[tuple[str, str], 'RateLimiter'] = {}
+    _limiters_lock = threading.Lock()
+
+    def __init__(self, name: str, rate: float, capacity: int) -> None:
+        """
+        :param name: the name of the provider and model for the logs
+        :param rate: the requests per second
+        :param capacity: the requests, which may be sent at once after an idle time
+        """
+        self.name = name
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens: float = float(self.capacity)
+        self._updated: float = time.monotonic()
+        self._blocked: float = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_limiter(cls, provider: str, model: str = '', rate: float = 1.0, capacity: int = 1) -> 'RateLimiter':
+        with cls._limiters_lock:
+            if (provider, model) not in cls._limiters:
+                cls._limiters[(provider, model)] = cls(name = f'{provider} {model}'.strip(), rate = rate,
+                                                       capacity = capacity)
+            return cls._limiters[(provider, model)]
+
+    def _reserve(self) -> float:
+        # take a token and return the seconds to wait for it, a negative number of tokens is the queue
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(-self._tokens / self.rate, self._blocked - now, 0.0)
+
+    def _release(self) -> None:
+        # return the token of a request, which was not sent
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    def _get_blocked(self) -> float:
+        with self._lock:
+            return max(self._blocked - time.monotonic(), 0.0)
+
+    def _acquire(self) -> None:
+        # a request queued before a rate limit of another session waits for the block and queues again
+        while True:
+            time.sleep(self._reserve())
+            if not (blocked := self._get_blocked()): return
+            self._release()
+            time.sleep(blocked)
+
+    async def _acquire_async(self) -> None:
+        while True:
+            try:
+                await asyncio.sleep(self._reserve())
+            except asyncio.CancelledError:
+                # the token of a cancelled request is available for the queued requests again
+                self._release()
+                raise
+            if not (blocked := self._get_blocked()): return
+            self._release()
+            await asyncio.sleep(blocked)
+
+    def _backoff(self, attempt: int, exception: Exception) -> float:
+        delay = get_retry_after(exception)
+        if delay is None: delay = CONFIG.rate_backoff * 2 ** attempt * random.uniform(0.5, 1.0)
+        if not is_rate_limit(exception):
+            logger.warning(f'Request to "{self.name}" failed with exception: {exception}, '
+                           f'retry {attempt + 1} in {delay:.1f} seconds.')
+            return delay
+        # block the bucket for all sessions, so they do not hit the limit again meanwhile
+        with self._lock:
+            self._blocked = max(self._blocked, time.monotonic() + delay)
+        logger.warning(f'Rate limit of "{self.name}" reached, retry {attempt + 1} in {delay:.1f} seconds.')
+        return delay
+
+    def call(self, func: Callable[[], T], errors: tuple[type[Exception], ...]) -> T:
+        """
+        Call a request, when a token is available, and retry it, if it is rate limited or failed transiently.
+        The sync call sleeps in the calling thread, so it must not be used within the event loop.
+
+        :param func: the request
+        :param errors: the exceptions of a failed request, only the transient ones are retried
+        :return: the result of the request
+        """
+        for attempt in itertools.count():
+            self._acquire()
+            try:
+                return func()
+            except errors as exception:
+                if attempt >= CONFIG.rate_retries or not is_transient(exception): raise
+                time.sleep(self._backoff(attempt, exception))
+
+    async def call_async(self, func: Callable[[], Awaitable[T]], errors: tuple[type[Exception], ...]) -> T:
+        """
+        Call a request, when a token is available, and retry it, if it is rate limited or failed transiently.
+
+        :param func: the coroutine function of the request
+        :param errors: the exceptions of a failed request, only the transient ones are retried
+        :return: the result of the request
+        """
+        for attempt in itertools.count():
+            await self._acquire_async()
+            try:
+                return await func()
+            except errors as exception:
+                if attempt >= CONFIG.rate_retries or not is_transient(exception): raise
+                await asyncio.sleep(self._backoff(attempt, exception))
@@ -0,0 +1,106 @@
+import hashlib
+import asyncio
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import AsyncContextManager, Awaitable, Callable, Hashable, Iterable, Optional, TypeVar
+from backend.logger.logger import logger
+
+T = TypeVar('T')
+
+
+def get_batch_hash(source_words: Iterable[str]) -> str:
+    """
+    Args:
+        source_words: the source words of a batch
+    Returns:
+        the hash of the content of the batch
+    """
+    return hashlib.sha256('\n'.join(source_words).encode()).hexdigest()[:32]
+
+
+class SingleFlight(object):
+    """
+    The SingleFlight coalesces identical requests in flight of all sessions of one translator.
+    The first request of a key is sent upstream, the concurrent requests of the same key wait for it
+    and share its result or its exception. The key is free again as soon as the request is finished,
+    so nothing is cached beyond the requests in flight.
+    """
+
+    __slots__ = (
+        'name',
+        '_futures',
+        '_tasks',
+        '_waiters',
+        '_lock'
+    )
+
+    def __init__(self, name: str) -> None:
+        """
+        :param name: the name of the translator for the logs
+        """
+        self.name = name
+        # the requests in flight of the threads and of the event loop
+        self._futures: dict[Hashable, Future] = {}
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+        # the sessions waiting for every task, a task is cancelled with its last waiting session
+        self._waiters: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def call(self, key: Hashable, func: Callable[[], T]) -> T:
+        """
+        Call a request or wait for the identical request in flight.
+
+        :param key: the key of identical requests
+        :param func: the request
+        :return: the result of the request
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            leader = future is None
+            if leader: future = self._futures[key] = Future()
+        if not leader:
+            logger.info(f'Join the identical request of "{self.name}" in flight.')
+            return future.result()
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except BaseException as exception:
+            future.set_exception(exception)
+            raise
+        finally:
+            with self._lock:
+                del self._futures[key]
+
+    @staticmethod
+    async def _lead(func: Callable[[], Awaitable[T]], slot: Optional[AsyncContextManager]) -> T:
+        if slot is None: return await func()
+        async with slot:
+            return await func()
+
+    async def call_async(self, key: Hashable, func: Callable[[], Awaitable[T]],
+                         slot: Optional[AsyncContextManager] = None) -> T:
+        """
+        Call a request or wait for the identical request in flight.
+
+        :param key: the key of identical requests
+        :param func: the coroutine function of the request
+        :param slot: the worker slot of the session, which is only taken by the request sent upstream
+        :return: the result of the request
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(self._lead(func, slot))
+        else:
+            logger.info(f'Join the identical request of "{self.name}" in flight.')
+        self._waiters[key] += 1
+        try:
+            # a cancelled session does not cancel the request of the other sessions
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if self._waiters[key] <= 0:
+                del self._waiters[key]
+                if self._tasks.get(key) is task: del self._tasks[key]
+                if not task.done(): task.cancel()
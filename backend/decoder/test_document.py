@@ -0,0 +1,22 @@
+from backend.decoder.document import DecodedDocument
+
+
+def test_set_sources_renews_generation() -> None:
+    document = DecodedDocument(['Ein', 'Satz.'])
+    generation = document.generation
+    document.set_sources(['Ein', 'Satz.'])
+    assert document.generation > generation
+    # the generations of different documents differ as well
+    assert DecodedDocument(['Ein', 'Satz.']).generation not in (generation, document.generation)
+
+
+def test_set_page_renews_generation_on_changed_sources() -> None:
+    document = DecodedDocument(['Ein', 'Satz.', 'Noch', 'einer.'])
+    generation = document.generation
+    # edited target words keep the positions of the source words
+    document.set_page(0, 2, ['Ein', 'Satz.'], ['A', 'sentence.'])
+    assert document.generation == generation and document.targets == ['A', 'sentence.', '', '']
+    document.set_page(0, 2, ['Ein', 'langer', 'Satz.'], ['A', 'long', 'sentence.'])
+    assert document.generation > generation
+    assert list(document.sources) == ['Ein', 'langer', 'Satz.', 'Noch', 'einer.']
+    assert list(document.eos_indices) == [3, 5]
@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+from backend.decoder.job_scheduler import JobScheduler
+
+
+async def start(scheduler: JobScheduler, user: str, granted: list[str]) -> asyncio.Task:
+    async def acquire() -> None:
+        await scheduler.acquire(user)
+        granted.append(user)
+
+    task = asyncio.create_task(acquire())
+    # let the task enqueue its batch
+    await asyncio.sleep(0)
+    return task
+
+
+def test_acquire_within_workers() -> None:
+    async def main() -> None:
+        scheduler = JobScheduler(name = 'test', workers = 2)
+        await scheduler.acquire('a')
+        await scheduler.acquire('b')
+        assert scheduler._running == 2 and not scheduler._queues
+        scheduler.release('a')
+        scheduler.release('b')
+        assert scheduler._running == 0 and not scheduler._active
+
+    asyncio.run(main())
+
+
+def test_workers_are_granted_round_robin() -> None:
+    async def main() -> None:
+        scheduler = JobScheduler(name = 'test', workers = 1)
+        await scheduler.acquire('x')
+        granted = []
+        tasks = [await start(scheduler, user, granted) for user in ('a', 'a', 'a', 'b', 'c')]
+        for _ in tasks:
+            scheduler.release(granted[-1] if granted else 'x')
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        # the large job of user a does not starve the small jobs of the users b and c
+        assert granted == ['a', 'b', 'c', 'a', 'a']
+
+    asyncio.run(main())
+
+
+def test_cancelled_batches_are_skipped() -> None:
+    async def main() -> None:
+        scheduler = JobScheduler(name = 'test', workers = 1)
+        await scheduler.acquire('x')
+        granted = []
+        cancelled = await start(scheduler, 'a', granted)
+        waiting = await start(scheduler, 'b', granted)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        scheduler.release('x')
+        await waiting
+        assert granted == ['b'] and scheduler._running == 1
+
+    asyncio.run(main())
+
+
+def test_worker_granted_on_cancellation_is_passed_on() -> None:
+    async def main() -> None:
+        scheduler = JobScheduler(name = 'test', workers = 1)
+        await scheduler.acquire('x')
+        granted = []
+        cancelled = await start(scheduler, 'a', granted)
+        waiting = await start(scheduler, 'b', granted)
+        # the worker is granted to user a, which is cancelled before it runs
+        scheduler.release('x')
+        cancelled.cancel()
+        await waiting
+        assert granted == ['b'] and scheduler._running == 1 and dict(scheduler._active) == {'b': 1}
+
+    asyncio.run(main())
+
+
+def test_get_status() -> None:
+    async def main() -> None:
+        scheduler = JobScheduler(name = 'test', workers = 2, duration = 1.0)
+        assert scheduler.get_status('a') == (0, 0.0)
+        await scheduler.acquire('a')
+        await scheduler.acquire('a')
+        granted = []
+        tasks = [await start(scheduler, user, granted) for user in ('a', 'a', 'b', 'b', 'b')]
+        # user a runs two batches and waits for two more, the workers are shared with user b
+        assert scheduler.get_status('a') == (1, 4.0)
+        assert scheduler.get_status('b') == (2, 3.0)
+        assert scheduler.get_status('c') == (0, 0.0)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions = True)
+
+    asyncio.run(main())
+
+
+def test_slot_measures_finished_batches() -> None:
+    async def main() -> None:
+        scheduler = JobScheduler(name = 'test', workers = 1, duration = 2.0)
+        slot = scheduler.get_slot('a')
+        async with slot:
+            await asyncio.sleep(0.05)
+        assert scheduler.duration == pytest.approx(0.8 * 2.0 + 0.2 * 0.05, abs = 0.01)
+        duration = scheduler.duration
+        with pytest.raises(ValueError):
+            async with slot:
+                raise ValueError()
+        # a failed batch is not measured and its worker is released
+        assert scheduler.duration == duration and scheduler._running == 0
+
+    asyncio.run(main())
+
+
+def test_get_status_without_cancelled_batches() -> None:
+    async def main() -> None:
+        scheduler = JobScheduler(name = 'test', workers = 1, duration = 1.0)
+        await scheduler.acquire('x')
+        granted = []
+        cancelled = [await start(scheduler, 'a', granted) for _ in range(3)]
+        waiting = await start(scheduler, 'b', granted)
+        for task in cancelled:
+            task.cancel()
+        await asyncio.gather(*cancelled, return_exceptions = True)
+        # the cancelled job of user a leaves the queue, so user b is next
+        assert 'a' not in scheduler._queues
+        assert scheduler.get_status('a') == (0, 0.0)
+        assert scheduler.get_status('b') == (1, 2.0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions = True)
+        assert not scheduler._queues
+
+    asyncio.run(main())
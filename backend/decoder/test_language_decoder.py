@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from backend.error.error import DecoderError, NormalTranslatorError
+from backend.decoder.normal_translator import NormalTranslator, GOOGLE_TRANSLATOR
+from backend.decoder.language_decoder import LanguageDecoder
+
+SOURCE_TEXT = ' '.join(f'Satz {i} Wort X.' for i in range(10))
+
+
+@pytest.fixture
+def decoder(monkeypatch, tmp_path) -> LanguageDecoder:
+    # the user data of the decoder is written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(LanguageDecoder, 'models', property(lambda decoder: [GOOGLE_TRANSLATOR]))
+
+    async def translate(translator, source_words, *args, **kwargs):
+        # one sentence of four words per batch
+        for i in range(0, len(source_words), 4):
+            await asyncio.sleep(0.01)
+            yield i, [word.lower() for word in source_words[i:i + 4]]
+
+    monkeypatch.setattr(NormalTranslator, 'iter_translate_async', translate)
+    decoder = LanguageDecoder(source_language = 'german')
+    decoder.model_name = GOOGLE_TRANSLATOR
+    decoder.source_text = SOURCE_TEXT
+    decoder.split_text()
+    return decoder
+
+
+def test_decode_range_async(decoder) -> None:
+    asyncio.run(decoder.decode_range_async(start = 0, stop = 12))
+    assert decoder.target_words[:12] == [word.lower() for word in decoder.source_words[:12]]
+    assert not any(decoder.target_words[12:])
+
+
+def test_page_edit_stops_decoding(decoder) -> None:
+    async def main() -> None:
+        task = asyncio.ensure_future(decoder.decode_range_async(start = 0, stop = 40))
+        await asyncio.sleep(0.015)
+        # a word is inserted into the first page, so the positions of the following words move
+        decoder.document.set_page(0, 4, ['Satz', '0', 'neues', 'Wort', 'X.'], ['', '', '', '', ''])
+        await task
+
+    asyncio.run(main())
+    # the batches of the previous source words are not written into the moved positions
+    assert not any(decoder.target_words[5:])
+    assert len(decoder.target_words) == len(decoder.source_words) == 41
+    # the edited sentence is decoded again with the current positions
+    asyncio.run(decoder.decode_range_async(start = 0, stop = 9))
+    assert decoder.target_words[:9] == [word.lower() for word in decoder.source_words[:9]]
+
+
+def cancel_decoding(decoder: LanguageDecoder) -> None:
+    async def main() -> None:
+        # the first sentence is decoded before the cancel
+        task = asyncio.ensure_future(decoder.decode_words_async())
+        await asyncio.sleep(0.015)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions = True)
+
+    asyncio.run(main())
+
+
+def test_resumable_after_cancel_only(decoder) -> None:
+    assert not decoder.resumable
+    cancel_decoding(decoder)
+    assert decoder.resumable and decoder.target_words[:4] == [word.lower() for word in decoder.source_words[:4]]
+    asyncio.run(decoder.decode_words_async())
+    assert all(decoder.target_words) and not decoder.resumable
+    # a target word cleared by the user does not restart the decoding
+    decoder.target_words[1] = ''
+    assert not decoder.resumable
+
+
+@pytest.mark.parametrize('code, resumable', [(429, True), (400, False)])
+def test_resumable_after_transient_error_only(decoder, monkeypatch, code: int, resumable: bool) -> None:
+    async def translate(translator, source_words, *args, **kwargs):
+        yield 0, [word.lower() for word in source_words[:4]]
+        raise NormalTranslatorError('Translation failed', code = code)
+
+    monkeypatch.setattr(NormalTranslator, 'iter_translate_async', translate)
+    with pytest.raises(DecoderError):
+        asyncio.run(decoder.decode_words_async())
+    assert decoder.resumable is resumable
+
+
+def test_resume_keeps_edited_target_words(decoder) -> None:
+    cancel_decoding(decoder)
+    decoder.target_words[5] = 'edited'
+    asyncio.run(decoder.decode_words_async())
+    # only the empty target words of the partly edited sentence are filled
+    expected = [word.lower() for word in decoder.source_words]
+    assert decoder.target_words == expected[:5] + ['edited'] + expected[6:]
@@ -18,9 +18,6 @@ with open(source_path, 'r', encoding = 'utf-8') as file:
     source_words = file.read().split()
 
 translator = NeuralTranslator(
-    model_name = MODEL_NAME,
-    source_language = 'russian',
-    target_language = 'german',
     model_temp = 0.0,
     model_seed = 0,
     api_url = URL,
@@ -32,12 +29,17 @@ NeuralTranslator.PROMPT = NeuralTranslator._load_prompt(prompt_path = prompt_pat
 # user: provide the text e.g. CSV input for the translation process
 # assistant: offer a sample translation or expected output format
 
-target_words = translator.translate_batch(source_words = source_words)
+target_words = translator.translate_batch(
+    source_words = source_words,
+    source_language = 'russian',
+    target_language = 'german',
+    model_name = MODEL_NAME
+)
 
 # print(f'Translate words with: {MODEL_NAME}')
 # response = translator.client.chat.completions.create(
 #     messages = [  # system, user, assistant
-#         {'role': 'system', 'content': translator._get_prompt()},
+#         {'role': 'system', 'content': translator._get_prompt('russian', 'german')},
 #         {'role': 'user', 'content': translator._to_csv(source_words)},
 #         # {'role': 'assistant', 'content': 'Source\tTarget\n'}
 #     ],
@@ -45,9 +47,9 @@ target_words = translator.translate_batch(source_words = source_words)
 #     temperature = 0.0,
 #     seed = 0,
 # )
-# target_words = translator._check_content(
+# target_words = [row[-1] if row else None for row in translator._check_content(
 #     content = response.choices[0].message.content,
-#     csv_len = len(source_words) + 1
-# )
+#     source_words = source_words
+# )]
 
 pp.pprint(list(zip(source_words, target_words)))
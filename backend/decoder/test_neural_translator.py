@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from backend.decoder.neural_translator import NeuralTranslator
+from backend.user_data.translation_memory import TranslationMemory
+
+SOURCE_WORDS = ['Der', 'Hund,', '"bellt"', 'laut.']
+
+
+def get_content(rows: list[tuple[str, str]], header: bool = True) -> str:
+    lines = ['Source\tTarget'] if header else []
+    lines += [f'{source}\t{target}' for source, target in rows]
+    return '\n'.join(lines)
+
+
+def get_targets(aligned: list) -> list:
+    return [row[-1] if row else None for row in aligned]
+
+
+def test_check_content_aligns_complete_rows() -> None:
+    translator = NeuralTranslator()
+    content = get_content([('Der', 'The'), ('Hund,', 'dog,'), ('"bellt"', 'barks'), ('laut.', 'loudly.')])
+    aligned = translator._check_content(content = content, source_words = SOURCE_WORDS)
+    assert get_targets(aligned) == ['The', 'dog,', 'barks', 'loudly.']
+
+
+def test_check_content_without_header_and_invalid_rows() -> None:
+    translator = NeuralTranslator()
+    content = 'Here is the translation:\n' + get_content([('Der', 'The'), ('Hund,', 'dog,'), ('"bellt"', 'barks'),
+                                                          ('laut.', 'loudly.')], header = False) + '\n'
+    aligned = translator._check_content(content = content, source_words = SOURCE_WORDS)
+    assert get_targets(aligned) == ['The', 'dog,', 'barks', 'loudly.']
+
+
+def test_check_content_with_missing_row() -> None:
+    translator = NeuralTranslator()
+    # the missing row leaves only its source word without a target instead of shifting the following rows
+    content = get_content([('Der', 'The'), ('"bellt"', 'barks'), ('laut.', 'loudly.')])
+    aligned = translator._check_content(content = content, source_words = SOURCE_WORDS)
+    assert get_targets(aligned) == ['The', None, 'barks', 'loudly.']
+
+
+def test_check_content_with_additional_row() -> None:
+    translator = NeuralTranslator()
+    content = get_content([('Der', 'The'), ('Hund,', 'dog,'), ('sehr', 'very'), ('"bellt"', 'barks'),
+                           ('laut.', 'loudly.')])
+    aligned = translator._check_content(content = content, source_words = SOURCE_WORDS)
+    assert get_targets(aligned) == ['The', 'dog,', 'barks', 'loudly.']
+
+
+def test_check_content_with_differently_echoed_words() -> None:
+    translator = NeuralTranslator()
+    # the echoed source words are compared without their quotes and punctuations
+    content = get_content([('Der', 'The'), ('Hund', 'dog,'), ('bellt', 'barks'), ('"laut"', 'loudly.')])
+    aligned = translator._check_content(content = content, source_words = SOURCE_WORDS)
+    assert get_targets(aligned) == ['The', 'dog,', 'barks', 'loudly.']
+    # a misspelled echo is taken by its position, if the number of words is equal
+    content = get_content([('Der', 'The'), ('Hunt,', 'dog,'), ('"bellt"', 'barks'), ('laut.', 'loudly.')])
+    aligned = translator._check_content(content = content, source_words = SOURCE_WORDS)
+    assert get_targets(aligned) == ['The', 'dog,', 'barks', 'loudly.']
+
+
+def test_check_content_with_empty_content() -> None:
+    translator = NeuralTranslator()
+    assert translator._check_content(content = '', source_words = SOURCE_WORDS) == [None] * len(SOURCE_WORDS)
+
+
+def test_iter_translate_async_memory_off_event_loop(monkeypatch, tmp_path) -> None:
+    threads = {}
+
+    def record(method):
+        def wrapper(memory, *args):
+            threads.setdefault(method.__name__, []).append(threading.current_thread())
+            return method(memory, *args)
+        return wrapper
+
+    async def translate(translator, source_words, *args, **kwargs) -> list[str]:
+        return [word.upper() for word in source_words]
+
+    monkeypatch.setattr(NeuralTranslator, '_memory', TranslationMemory(db_path = str(tmp_path / 'memory.db')))
+    monkeypatch.setattr(TranslationMemory, 'get_many', record(TranslationMemory.get_many))
+    monkeypatch.setattr(TranslationMemory, 'set_many', record(TranslationMemory.set_many))
+    monkeypatch.setattr(NeuralTranslator, 'models', property(lambda translator: {'test': 'test/model'}))
+    monkeypatch.setattr(NeuralTranslator, 'get_model_info', lambda translator, model_name: None)
+    monkeypatch.setattr(NeuralTranslator, '_translate_async', translate)
+    translator = NeuralTranslator()
+
+    async def main() -> list[str]:
+        return await translator.translate_batch_async(SOURCE_WORDS, source_language = 'german',
+                                                      target_language = 'english', model_name = 'test')
+
+    assert asyncio.run(main()) == [word.upper() for word in SOURCE_WORDS]
+    # the sqlite queries and commits of the memory do not run on the thread of the event loop
+    assert threads.keys() == {'get_many', 'set_many'}
+    assert threading.main_thread() not in threads['get_many'] + threads['set_many']
+    # the memorized sentence is served without a request
+    async def fail(translator, source_words, *args, **kwargs) -> list[str]:
+        raise AssertionError(source_words)
+
+    monkeypatch.setattr(NeuralTranslator, '_translate_async', fail)
+    assert asyncio.run(main()) == [word.upper() for word in SOURCE_WORDS]
+
+
+def test_translate_retried_without_sentences_in_combined_mode(monkeypatch) -> None:
+    requests = []
+
+    def request(translator, source_words, source_language, target_language, model_name, combined) -> list:
+        requests.append((source_words, combined))
+        if not combined: return [word.lower() for word in source_words]
+        # the row of the second word is missing in the reply of the whole sentence
+        return [('der', ''), None, ('"bellt"', ''), ('laut.', 'The dog barks loudly.')]
+
+    monkeypatch.setattr(NeuralTranslator, '_request', request)
+    translator = NeuralTranslator()
+    targets = translator._translate_retried(SOURCE_WORDS, 'german', 'english', 'test', combined = True)
+    # the missing word is retried out of its sentence, so its row has no sentence cell
+    assert requests == [(SOURCE_WORDS, True), (['Hund,'], False)]
+    assert targets == [('der', ''), ('hund,', ''), ('"bellt"', ''), ('laut.', 'The dog barks loudly.')]
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import pytest
+from deep_translator import GoogleTranslator
+from backend.error.error import NormalTranslatorError
+from backend.decoder.normal_translator import NormalTranslator
+
+
+@pytest.fixture
+def requests(monkeypatch) -> list[tuple[str, str, str, str]]:
+    # the requests of the public API with their languages and the name of the requesting thread
+    requests = []
+
+    def translate(translator: GoogleTranslator, text: str, **kwargs) -> str:
+        requests.append((translator.source, translator.target, text, threading.current_thread().name))
+        return '\n'.join(word.upper() for word in text.split('\n'))
+
+    monkeypatch.setattr(GoogleTranslator, 'translate', translate)
+    return requests
+
+
+def test_translate_batch_uses_public_api(requests) -> None:
+    translator = NormalTranslator()
+    source_words = ['eins', 'zwei', 'eins', 'drei']
+    targets = translator.translate_batch(source_words, source_language = 'german', target_language = 'english',
+                                         cache = False)
+    assert targets == ['EINS', 'ZWEI', 'EINS', 'DREI']
+    # the duplicates are sent once with the language codes of the public API
+    assert [request[:3] for request in requests] == [('de', 'en', 'eins\nzwei\ndrei')]
+
+
+def test_translate_batch_async_runs_off_event_loop(requests) -> None:
+    translator = NormalTranslator()
+    source_words = ['vier', 'fünf']
+    targets = asyncio.run(translator.translate_batch_async(source_words, source_language = 'german',
+                                                           target_language = 'english', user = 'a', cache = False))
+    assert targets == ['VIER', 'FÜNF']
+    assert len(requests) == 1 and requests[0][3].startswith('NormalTranslator')
+
+
+def test_translate_same_languages_without_request(requests) -> None:
+    translator = NormalTranslator()
+    targets = translator.translate_batch(['sechs'], source_language = 'german', target_language = 'german',
+                                         cache = False)
+    assert targets == ['sechs'] and not requests
+
+
+def test_translate_validates_length() -> None:
+    translator = NormalTranslator()
+    # the public API rejects texts of 5000 characters and more before any request
+    with pytest.raises(NormalTranslatorError) as error:
+        translator._translate(['x' * 5000], languages = ('de', 'en'))
+    assert error.value.code == 500
+
+
+def test_translate_batch_caches_words(requests) -> None:
+    translator = NormalTranslator()
+    for _ in range(2):
+        translator.translate_batch(['sieben', 'acht'], source_language = 'german', target_language = 'english')
+    assert len(requests) == 1
+    # the words of a detected source language are not cached
+    for _ in range(2):
+        translator.translate_batch(['neun'], source_language = 'auto', target_language = 'english')
+    assert len(requests) == 3
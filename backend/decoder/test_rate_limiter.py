@@ -0,0 +1,142 @@
+import time
+import asyncio
+from typing import Optional
+from types import SimpleNamespace
+import pytest
+from deep_translator.exceptions import TooManyRequests
+from backend.config.config import CONFIG
+from backend.decoder import rate_limiter
+from backend.decoder.rate_limiter import RateLimiter, get_retry_after, is_rate_limit, is_transient
+
+
+class FakeError(Exception):
+
+    def __init__(self, status_code: Optional[int] = None, retry_after: Optional[str] = '0') -> None:
+        super().__init__(f'status {status_code}')
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers = {} if retry_after is None else {'retry-after': retry_after})
+
+
+def get_failing(failures: list[Exception], calls: list[float]):
+    def func() -> str:
+        calls.append(time.monotonic())
+        if failures: raise failures.pop(0)
+        return 'ok'
+    return func
+
+
+def test_get_limiter_is_shared() -> None:
+    limiter = RateLimiter.get_limiter(provider = 'test', model = 'shared')
+    assert RateLimiter.get_limiter(provider = 'test', model = 'shared') is limiter
+    assert RateLimiter.get_limiter(provider = 'test', model = 'other') is not limiter
+
+
+def test_get_retry_after() -> None:
+    assert get_retry_after(FakeError(429, retry_after = '1.5')) == 1.5
+    assert get_retry_after(FakeError(429, retry_after = None)) is None
+    assert get_retry_after(FakeError(429, retry_after = 'Wed, 21 Oct 2015 07:28:00 GMT')) is None
+    assert get_retry_after(Exception()) is None
+
+
+def test_is_transient() -> None:
+    assert all(is_transient(FakeError(status_code)) for status_code in (None, 408, 409, 429, 500, 503))
+    assert not any(is_transient(FakeError(status_code)) for status_code in (400, 401, 403, 404, 422))
+
+
+def test_is_rate_limit() -> None:
+    assert is_rate_limit(FakeError(429)) and is_rate_limit(TooManyRequests())
+    assert not any(is_rate_limit(FakeError(status_code)) for status_code in (None, 500))
+
+
+def test_reserve_spaces_requests() -> None:
+    limiter = RateLimiter(name = 'test', rate = 10.0, capacity = 2)
+    waits = [limiter._reserve() for _ in range(4)]
+    assert waits[0] == waits[1] == 0.0
+    assert waits[2] == pytest.approx(0.1, abs = 0.01) and waits[3] == pytest.approx(0.2, abs = 0.01)
+
+
+def test_call_retries_rate_limit_and_blocks_bucket() -> None:
+    limiter = RateLimiter(name = 'test', rate = 1000.0, capacity = 1)
+    calls = []
+    assert limiter.call(get_failing([FakeError(429, retry_after = '0.05')], calls), errors = (FakeError,)) == 'ok'
+    assert len(calls) == 2 and calls[1] - calls[0] >= 0.05
+    assert limiter._blocked > 0.0
+
+
+def test_call_blocks_bucket_on_google_rate_limit(monkeypatch) -> None:
+    # the Google rate limit has no Retry-After header, so the exponential backoff is shortened
+    monkeypatch.setattr(rate_limiter, 'CONFIG', CONFIG._replace(rate_backoff = 0.05))
+    limiter = RateLimiter(name = 'test', rate = 1000.0, capacity = 1)
+    calls = []
+    assert limiter.call(get_failing([TooManyRequests()], calls), errors = (TooManyRequests,)) == 'ok'
+    assert len(calls) == 2 and limiter._blocked > 0.0
+
+
+def test_call_retries_transient_errors_without_blocking() -> None:
+    limiter = RateLimiter(name = 'test', rate = 1000.0, capacity = 1)
+    calls = []
+    failures = [FakeError(None), FakeError(503), FakeError(408)]
+    assert limiter.call(get_failing(failures, calls), errors = (FakeError,)) == 'ok'
+    assert len(calls) == 4 and limiter._blocked == 0.0
+
+
+def test_call_raises_other_errors() -> None:
+    limiter = RateLimiter(name = 'test', rate = 1000.0, capacity = 1)
+    calls = []
+    with pytest.raises(FakeError):
+        limiter.call(get_failing([FakeError(400)], calls), errors = (FakeError,))
+    assert len(calls) == 1
+    # the errors, which are not passed, are not retried at all
+    with pytest.raises(ValueError):
+        limiter.call(get_failing([ValueError()], calls), errors = (FakeError,))
+    assert len(calls) == 2
+
+
+def test_call_raises_after_retries() -> None:
+    limiter = RateLimiter(name = 'test', rate = 1000.0, capacity = 1)
+    calls = []
+    failures = [FakeError(429) for _ in range(CONFIG.rate_retries + 1)]
+    with pytest.raises(FakeError):
+        limiter.call(get_failing(failures, calls), errors = (FakeError,))
+    assert len(calls) == CONFIG.rate_retries + 1
+
+
+def test_queued_request_waits_for_later_block() -> None:
+    limiter = RateLimiter(name = 'test', rate = 20.0, capacity = 1)
+    calls = []
+
+    async def request() -> str:
+        calls.append(time.monotonic())
+        return 'ok'
+
+    async def main() -> None:
+        limiter._reserve()
+        # the request is queued for 0.05 seconds, before another session is rate limited for 0.2 seconds
+        task = asyncio.create_task(limiter.call_async(request, errors = (FakeError,)))
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        limiter._backoff(0, FakeError(429, retry_after = '0.2'))
+        assert await task == 'ok'
+        assert calls[0] - started >= 0.19
+
+    asyncio.run(main())
+
+
+def test_cancelled_request_returns_token() -> None:
+    limiter = RateLimiter(name = 'test', rate = 1.0, capacity = 1)
+
+    async def request() -> str:
+        return 'ok'
+
+    async def main() -> None:
+        limiter._reserve()
+        tasks = [asyncio.create_task(limiter.call_async(request, errors = (FakeError,))) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert limiter._tokens < -2.5
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions = True)
+        # only the token of the first reservation is taken, the next request waits one second only
+        assert limiter._reserve() == pytest.approx(1.0, abs = 0.05)
+
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from backend.decoder.single_flight import SingleFlight, get_batch_hash
+
+
+def test_get_batch_hash() -> None:
+    assert get_batch_hash(['a', 'b']) == get_batch_hash(iter(['a', 'b']))
+    assert get_batch_hash(['a', 'b']) != get_batch_hash(['a b'])
+    assert get_batch_hash(['ab']) != get_batch_hash(['a', 'b'])
+
+
+def test_call_coalesces_threads() -> None:
+    flights = SingleFlight(name = 'test')
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def request() -> str:
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'ok'
+
+    with ThreadPoolExecutor(max_workers = 4) as executor:
+        leader = executor.submit(flights.call, 'key', request)
+        started.wait(5)
+        followers = [executor.submit(flights.call, 'key', request) for _ in range(3)]
+        # let the followers join the request in flight
+        time.sleep(0.05)
+        release.set()
+        assert leader.result() == 'ok' and [future.result() for future in followers] == ['ok'] * 3
+    assert len(calls) == 1 and not flights._futures
+    # the key is free again after the request, so nothing is cached
+    assert flights.call('key', lambda: 'new') == 'new'
+
+
+def test_call_shares_exception() -> None:
+    flights = SingleFlight(name = 'test')
+
+    def request() -> str:
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        flights.call('key', request)
+    assert not flights._futures
+
+
+def test_call_async_coalesces_requests() -> None:
+    flights = SingleFlight(name = 'test')
+    calls = []
+
+    async def request() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'ok'
+
+    async def main() -> None:
+        results = await asyncio.gather(*(flights.call_async('key', request) for _ in range(5)),
+                                       flights.call_async('other', request))
+        assert results == ['ok'] * 6 and len(calls) == 2
+        assert not flights._tasks and not flights._waiters
+
+    asyncio.run(main())
+
+
+def test_call_async_shares_exception() -> None:
+    flights = SingleFlight(name = 'test')
+
+    async def request() -> str:
+        await asyncio.sleep(0.01)
+        raise ValueError()
+
+    async def main() -> None:
+        results = await asyncio.gather(*(flights.call_async('key', request) for _ in range(3)),
+                                       return_exceptions = True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert not flights._tasks
+
+    asyncio.run(main())
+
+
+def test_call_async_cancellation() -> None:
+    flights = SingleFlight(name = 'test')
+    cancelled = []
+
+    async def request() -> str:
+        try:
+            await asyncio.sleep(0.05)
+            return 'ok'
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def main() -> None:
+        first = asyncio.create_task(flights.call_async('key', request))
+        second = asyncio.create_task(flights.call_async('key', request))
+        await asyncio.sleep(0.01)
+        # a cancelled session does not cancel the request of the other session
+        first.cancel()
+        assert await second == 'ok' and not cancelled
+        # the request is cancelled with its last waiting session
+        third = asyncio.create_task(flights.call_async('key', request))
+        await asyncio.sleep(0.01)
+        third.cancel()
+        await asyncio.gather(third, return_exceptions = True)
+        await asyncio.sleep(0)
+        assert cancelled and not flights._tasks and not flights._waiters
+
+    asyncio.run(main())
+
+
+def test_call_async_slot_of_leader_only() -> None:
+    flights = SingleFlight(name = 'test')
+    entered = []
+
+    def get_slot(user: str):
+        @asynccontextmanager
+        async def slot():
+            entered.append(user)
+            yield
+        return slot()
+
+    async def request() -> str:
+        await asyncio.sleep(0.01)
+        return 'ok'
+
+    async def main() -> None:
+        await asyncio.gather(*(flights.call_async('key', request, slot = get_slot(user)) for user in 'abc'))
+        assert entered == ['a']
+
+    asyncio.run(main())
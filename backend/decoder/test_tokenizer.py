@@ -0,0 +1,86 @@
+import re
+import random
+from backend.config.config import CONFIG, Regex
+from backend.decoder.tokenizer import Tokenizer, get_tokenizer, split_affixes
+
+CHARS = 'abcXYZ019 \n\t' + ''.join(CONFIG.Regex) + ''.join(CONFIG.Replacements) + '-_'
+
+
+def reformat_text_reference(text: str, regex: Regex, replacements: dict[str, str]) -> str:
+    # the regex cascade of the decoder before the Tokenizer, kept as reference
+    text = ' '.join(text.split()) + ' '
+    for chars in replacements.keys():
+        text = text.replace(chars, replacements.get(chars))
+    if regex.quotes and regex.close and regex.endofs:
+        text = re.sub(rf'([{regex.quotes}{regex.close}])\s*([{regex.endofs}])', r'\2\1', text)
+    if regex.begins and regex.opens:
+        text = re.sub(rf'([{regex.begins}{regex.opens}])\s*', r' \1', text)
+    if regex.ending and regex.close:
+        text = re.sub(rf'\s*([{regex.ending}{regex.close}])', r'\1 ', text)
+    if regex.puncts:
+        text = re.sub(rf'\s*([{regex.puncts}]+)(.+?)\s*', r'\1 \2', text)
+    if regex.digits:
+        text = re.sub(rf'(\d)\s*([{regex.digits}])\s*(\d)', r'\1\2\3', text)
+    for quote in regex.quotes:
+        text = re.sub(rf'([{quote}])\s*(.*?)\s*([{quote}])', r' \1\2\3 ', text)
+    if regex.quotes:
+        text = re.sub(rf'([{regex.quotes}])\s+([{regex.puncts}])', r'\1\2', text)
+    return ' '.join(text.split())
+
+
+def strip_word_reference(word: str) -> str:
+    if bool(re.fullmatch(r'[\W_]*', word)):
+        return word
+    return re.sub(r'\A[\W_]*|[\W_]*\Z', '', word)
+
+
+def wrap_word_reference(source_word: str, target_word: str) -> str:
+    target_word = strip_word_reference(target_word)
+    if bool(re.fullmatch(r'[\W_]*', source_word)):
+        return source_word
+    beg = re.search(r'\A[\W_]*', source_word).group()
+    end = re.search(r'[\W_]*\Z', source_word).group()
+    return f'{beg}{target_word}{end}'
+
+
+def replace_reference(text: str) -> str:
+    for chars, repl in CONFIG.Replacements.items():
+        text = text.replace(chars, repl)
+    return text
+
+
+def test_tokenize_matches_reference() -> None:
+    rng = random.Random(0)
+    tokenizer = get_tokenizer(regex = CONFIG.Regex)
+    for _ in range(5000):
+        text = ''.join(rng.choices(CHARS, k = rng.randint(0, 60)))
+        expected = reformat_text_reference(text, CONFIG.Regex, CONFIG.Replacements).split()
+        assert tokenizer.tokenize(text, replace = replace_reference) == expected, text
+
+
+def test_tokenize_with_partial_regex() -> None:
+    rng = random.Random(1)
+    # rules without their characters are skipped like in the reference
+    regex = CONFIG.Regex._replace(quotes = '', begins = '')
+    tokenizer = Tokenizer(regex = regex)
+    for _ in range(1000):
+        text = ''.join(rng.choices(CHARS, k = rng.randint(0, 60)))
+        assert tokenizer.tokenize(text) == reformat_text_reference(text, regex, {}).split(), text
+
+
+def test_get_tokenizer_is_cached() -> None:
+    assert get_tokenizer(regex = CONFIG.Regex) is get_tokenizer(regex = CONFIG.Regex._replace())
+
+
+def test_split_affixes_matches_reference() -> None:
+    rng = random.Random(2)
+    for _ in range(20000):
+        source_word, target_word = (''.join(rng.choices(CHARS.strip(), k = rng.randint(0, 8))) for _ in range(2))
+        prefix, core, suffix = split_affixes(source_word)
+        assert prefix + core + suffix == source_word
+        # the strip and wrap of the decoder with the affixes of split_affixes
+        target_prefix, target_core, _ = split_affixes(target_word)
+        stripped = target_core if target_core else target_prefix
+        assert stripped == strip_word_reference(target_word), target_word
+        wrapped = f'{prefix}{stripped}{suffix}' if core else source_word
+        assert wrapped == wrap_word_reference(source_word, target_word), (source_word, target_word)
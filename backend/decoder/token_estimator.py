@@ -0,0 +1,110 @@
+import math
+import threading
+from backend.logger.logger import logger
+
+# estimated characters per token of the scripts, calibrated per model with the usage of the replies
+CHARS_PER_TOKEN = {
+    'latin': 4.0,
+    'cyrillic': 3.0,
+    'greek': 3.0,
+    'arabic': 3.0,
+    'hebrew': 3.0,
+    'cjk': 1.2,
+    'other': 2.5
+}
+# the first code point after each script, the code points are checked in ascending order
+SCRIPT_RANGES = (
+    (0x0250, 'latin'),
+    (0x0370, 'other'),
+    (0x0400, 'greek'),
+    (0x0530, 'cyrillic'),
+    (0x0590, 'other'),
+    (0x0600, 'hebrew'),
+    (0x0700, 'arabic'),
+    (0x1E00, 'other'),
+    (0x1F00, 'latin'),
+    (0x2000, 'greek'),
+    (0x2E80, 'other'),
+    (0xA000, 'cjk'),
+    (0xAC00, 'other'),
+    (0xD7B0, 'cjk'),
+    (0xF900, 'other'),
+    (0xFB00, 'cjk')
+)
+
+
+def get_script(text: str) -> str:
+    """
+    Args:
+        text: the text, e.g. a word
+    Returns:
+        the script of the first letter of the text, latin if the text has no letter
+    """
+    for char in text:
+        if not char.isalpha(): continue
+        code = ord(char)
+        for stop, script in SCRIPT_RANGES:
+            if code < stop: return script
+        return 'other'
+    return 'latin'
+
+
+class TokenEstimator(object):
+    """
+    The TokenEstimator is a process-wide estimate of the number of tokens of a text for one model.
+    The characters per token depend on the script of every word and are calibrated
+    with the prompt tokens reported in the usage of the replies of the model.
+    """
+
+    __slots__ = (
+        'model_id',
+        'factors',
+        '_lock'
+    )
+
+    # weight of a new observation in the moving average of the calibration factors
+    ALPHA = 0.2
+
+    _estimators: dict[str, 'TokenEstimator'] = {}
+    _estimators_lock = threading.Lock()
+
+    def __init__(self, model_id: str) -> None:
+        """
+        :param model_id: the id of the model
+        """
+        self.model_id = model_id
+        # tokens of the model per estimated tokens of every script
+        self.factors: dict[str, float] = dict.fromkeys(CHARS_PER_TOKEN, 1.0)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_estimator(cls, model_id: str) -> 'TokenEstimator':
+        with cls._estimators_lock:
+            if model_id not in cls._estimators:
+                cls._estimators[model_id] = cls(model_id = model_id)
+            return cls._estimators[model_id]
+
+    def count(self, text: str) -> int:
+        script = get_script(text)
+        return math.ceil(len(text) / CHARS_PER_TOKEN[script] * self.factors[script])
+
+    def count_text(self, text: str) -> int:
+        # a text of several words, e.g. a prompt or a CSV, is counted word by word
+        return sum(map(self.count, text.split())) + text.count('\n')
+
+    def calibrate(self, text: str, tokens: int) -> None:
+        """
+        :param text: the text sent to the model
+        :param tokens: the tokens of the text reported by the model
+        """
+        estimate = self.count_text(text)
+        if tokens <= 0 or estimate <= 0: return
+        # the words of a request are mostly of one script, which gets the correction
+        words = text.split()
+        scripts = list(map(get_script, words))
+        script = max(set(scripts), key = scripts.count) if scripts else 'latin'
+        ratio = min(max(tokens / estimate, 0.25), 4.0)
+        with self._lock:
+            factor = self.factors[script]
+            self.factors[script] = min(max((1 - self.ALPHA) * factor + self.ALPHA * factor * ratio, 0.1), 10.0)
+        logger.info(f'Token factor of "{script}" for "{self.model_id}" calibrated to {self.factors[script]:.2f}')
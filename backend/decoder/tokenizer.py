@@ -0,0 +1,80 @@
+import re
+import functools
+from re import Pattern
+from typing import Callable
+from backend.config.config import Regex
+
+# leading marks, core and trailing marks of a word, a word of only marks is matched as leading marks
+AFFIX_PATTERN = re.compile(r'([\W_]*)(.*?)([\W_]*)', re.DOTALL)
+
+
+class Tokenizer(object):
+    """
+    The Tokenizer normalises whitespaces, punctuations, quotes and brackets of a text and splits it into words.
+    The rules are compiled once per Regex settings, use get_tokenizer to get the cached tokenizer.
+    """
+
+    __slots__ = ('_rules',)
+
+    def __init__(self, regex: Regex) -> None:
+        """
+        :param regex: the regex settings with the characters of the rules
+        """
+        self._rules: list[tuple[Pattern, str]] = []
+        if regex.quotes and regex.close and regex.endofs:
+            # swap quotes/brackets with EndOfSentence marks if quotes/brackets are followed by EndOfSentence marks
+            self._add_rule(rf'([{regex.quotes}{regex.close}])\s*([{regex.endofs}])', r'\2\1')
+        if regex.begins and regex.opens:
+            # remove any white whitespaces after "begin marks" and add one whitespace before "begin marks"
+            self._add_rule(rf'([{regex.begins}{regex.opens}])\s*', r' \1')
+        if regex.ending and regex.close:
+            # remove any white whitespaces before "ending marks" and add one whitespace after "ending marks"
+            self._add_rule(rf'\s*([{regex.ending}{regex.close}])', r'\1 ')
+        if regex.puncts:
+            # remove any white whitespaces before "punctuations" and add one whitespace after "punctuations"
+            #   if "punctuations" are followed by letters or whitespace
+            self._add_rule(rf'\s*([{regex.puncts}]+)(.+?)\s*', r'\1 \2')
+        if regex.digits:
+            # remove any whitespaces around "digit marks"
+            self._add_rule(rf'(\d)\s*([{regex.digits}])\s*(\d)', r'\1\2\3')
+        for quote in regex.quotes:
+            # remove any whitespaces inside "quote pairs" and add one whitespaces outside "quote pairs"
+            self._add_rule(rf'([{quote}])\s*(.*?)\s*([{quote}])', r' \1\2\3 ')
+        if regex.quotes:
+            # remove any whitespaces after "quotes" if followed by "punctuations"
+            self._add_rule(rf'([{regex.quotes}])\s+([{regex.puncts}])', r'\1\2')
+
+    def _add_rule(self, pattern: str, repl: str) -> None:
+        self._rules.append((re.compile(pattern), repl))
+
+    def tokenize(self, text: str, replace: Callable[[str], str] = None) -> list[str]:
+        """
+        :param text: the text to tokenize
+        :param replace: a function to replace language independent characters before tokenizing
+        :return: the list of words
+        """
+        # remove new lines. for regex add whitespace at the end of text
+        text = ' '.join(text.split()) + ' '
+        # replace special characters with common ones
+        if replace is not None:
+            text = replace(text)
+        for pattern, repl in self._rules:
+            text = pattern.sub(repl, text)
+        # split into words, which also removes redundant whitespaces
+        return text.split()
+
+
+@functools.lru_cache(maxsize = 32)
+def get_tokenizer(regex: Regex) -> Tokenizer:
+    return Tokenizer(regex = regex)
+
+
+def split_affixes(word: str) -> tuple[str, str, str]:
+    """
+    Args:
+        word: the word to split
+    Returns:
+        the leading marks, the core and the trailing marks of the word,
+        the core is empty if the word has no alphanumeric characters
+    """
+    return AFFIX_PATTERN.fullmatch(word).groups()
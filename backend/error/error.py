@@ -1,3 +1,4 @@
+import asyncio
 import traceback
 import functools
 from typing import Any, Callable
@@ -65,6 +66,19 @@ class UIConfigError(FrontendError):
 
 def catch(error: type[LanguageDecoderError]) -> Callable:
     def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as exception:
+                    message = f'Error in "{func.__name__}" with exception: {exception}\n{traceback.format_exc()}'
+                    logger.error(message)
+                    code = exception.code if hasattr(exception, 'code') else 500
+                    raise error(message, code = code)
+
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> Any:
             try:
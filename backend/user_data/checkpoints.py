@@ -0,0 +1,101 @@
+import os
+import json
+import hashlib
+from uuid import UUID
+from typing import Iterable, Optional, Union
+from backend.logger.logger import logger
+from backend.config.config import CONFIG
+
+FILE_DIR = os.path.dirname(os.path.relpath(__file__))
+
+
+class Checkpoints(object):
+    """
+    The Checkpoints store the decoded batches of a document as soon as they are finished,
+    so a cancelled, failed or reconnected decoding resumes with the remaining batches only.
+    The batches are appended to one json lines file per user and document,
+    an interrupted decoding is flagged by an empty file next to it.
+    """
+
+    __slots__ = (
+        'user_uuid',
+        'ckpts_path',
+        'json_path'
+    )
+
+    def __init__(self, user_uuid: Union[UUID, str] = '00000000-0000-0000-0000-000000000000',
+                 ckpts_path: str = 'ckpts') -> None:
+        """
+        :param user_uuid: user uuid to identify the corresponding checkpoints
+        :param ckpts_path: path to the checkpoints directory
+        """
+        self.user_uuid = '00000000-0000-0000-0000-000000000000' if CONFIG.on_prem else user_uuid
+        self.ckpts_path = os.path.join(FILE_DIR, ckpts_path)
+        self.json_path: Optional[str] = None
+
+    @staticmethod
+    def get_key(decoded_key: Iterable[str], source_words: Iterable[str]) -> str:
+        data = '\x1e'.join((*decoded_key, '\x1f'.join(source_words)))
+        return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+    def set_document(self, document_key: str) -> None:
+        self.json_path = os.path.join(self.ckpts_path, f'{self.user_uuid}_{document_key}.jsonl')
+
+    def _get_flag_path(self) -> Optional[str]:
+        return None if self.json_path is None else f'{os.path.splitext(self.json_path)[0]}.interrupted'
+
+    def set_interrupted(self, interrupted: bool = True) -> None:
+        # only a flagged decoding is resumed, the empty target words alone may be cleared by the user
+        flag_path = self._get_flag_path()
+        if flag_path is None: return
+        try:
+            if interrupted:
+                os.makedirs(self.ckpts_path, exist_ok = True)
+                with open(file = flag_path, mode = 'w', encoding = 'utf-8'):
+                    pass
+            elif os.path.isfile(flag_path):
+                os.remove(flag_path)
+        except OSError as exception:
+            logger.error(f'Could not flag checkpoints with exception: {exception}')
+
+    def is_interrupted(self) -> bool:
+        flag_path = self._get_flag_path()
+        return flag_path is not None and os.path.isfile(flag_path)
+
+    def load(self) -> list[tuple[int, list[str]]]:
+        # the start index and the target words of every checkpointed batch
+        if self.json_path is None or not os.path.isfile(self.json_path): return []
+        batches = []
+        try:
+            with open(file = self.json_path, mode = 'r', encoding = 'utf-8') as file:
+                for line in file:
+                    try:
+                        start, target_words = json.loads(line)
+                    except (ValueError, TypeError):
+                        # a batch may be written incompletely if the process is terminated
+                        continue
+                    batches.append((start, target_words))
+        except OSError as exception:
+            logger.error(f'Could not read checkpoints with exception: {exception}')
+            return []
+        logger.info(f'Loaded {len(batches)} checkpointed batches')
+        return batches
+
+    def add(self, start: int, target_words: list[str]) -> None:
+        if self.json_path is None: return
+        try:
+            os.makedirs(self.ckpts_path, exist_ok = True)
+            with open(file = self.json_path, mode = 'a', encoding = 'utf-8') as file:
+                file.write(json.dumps([start, target_words], ensure_ascii = False) + '\n')
+        except OSError as exception:
+            logger.error(f'Could not write checkpoint with exception: {exception}')
+
+    def remove(self) -> None:
+        # the checkpoints of a completely decoded document are not needed anymore
+        self.set_interrupted(False)
+        if self.json_path is None or not os.path.isfile(self.json_path): return
+        try:
+            os.remove(self.json_path)
+            logger.info('Removed checkpoints of the decoded document')
+        except OSError as exception:
+            logger.error(f'Could not remove checkpoints with exception: {exception}')
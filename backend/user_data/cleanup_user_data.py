@@ -8,7 +8,7 @@ FILE_DIR = os.path.dirname(os.path.relpath(__file__))
 
 def cleanup_files(directory: str, timeout: int = CONFIG.files_timeout) -> int:
     """
-    Cleanup json files older than timeout in days.
+    Cleanup json and json lines files older than timeout in days.
 
     :param directory: directory of the json files
     :param timeout: timeout in days
@@ -23,7 +23,7 @@ def cleanup_files(directory: str, timeout: int = CONFIG.files_timeout) -> int:
             logger.info(f'No json files to cleanup at "{files_path}"')
             return 0
 
-        json_files = (file for file in os.listdir(files_path) if file.endswith('.json'))
+        json_files = (file for file in os.listdir(files_path) if file.endswith(('.json', '.jsonl')))
         for json_file in json_files:
             json_path = os.path.join(files_path, json_file)
             if os.path.isfile(json_path) and os.path.getatime(json_path) < time_limit:
@@ -43,6 +43,7 @@ def main() -> None:
         logger.info(
             f'Removed: "{cleanup_files(directory = "dicts")}" dictionary files'
             f'Removed: "{cleanup_files(directory = "setts")}" settings files'
+            f'Removed: "{cleanup_files(directory = "ckpts")}" checkpoint files'
         )
     except Exception as exception:
         logger.error(f'Failed to cleanup user data with exception: {exception}")')
@@ -1,8 +1,10 @@
 import os
+import re
 import json
 from copy import copy
 from uuid import UUID
-from typing import Union
+from re import Pattern
+from typing import Optional, Union
 from backend.error.error import SettingsError, catch
 from backend.logger.logger import logger
 from backend.config.config import CONFIG, Regex
@@ -20,7 +22,8 @@ class Settings(object):
         'pdf_params',
         'regex',
         'json_date',
-        'json_hash'
+        'json_hash',
+        '_replacer'
     )
 
     def __init__(self, user_uuid: Union[UUID, str] = '00000000-0000-0000-0000-000000000000',
@@ -38,10 +41,29 @@ class Settings(object):
         self.regex: Regex = copy(CONFIG.Regex)
         self.json_date: float = 0.0
         self.json_hash: int = 0
+        self._replacer: tuple[tuple, dict[str, str], Optional[Pattern]] = ((), {}, None)
 
     def _get_hash(self) -> int:
         return hash(f'{self.app.get_values()}{self.replacements}{self.pdf_params}{self.regex}')
 
+    def _set_replacer(self) -> None:
+        items = tuple(self.replacements.items())
+        # the longest characters are matched first, so overlapping replacements are applied like a longest match
+        chars = sorted((chars for chars, _ in items if chars), key = len, reverse = True)
+        pattern = re.compile('|'.join(map(re.escape, chars))) if chars else None
+        self._replacer = (items, dict(items), pattern)
+
+    def replace(self, text: str) -> str:
+        """
+        Applies all replacements in a single pass over the text.
+        The compiled pattern is rebuilt if the replacements were changed since it was built.
+        """
+        if self._replacer[0] != tuple(self.replacements.items()):
+            self._set_replacer()
+        _, replacements, pattern = self._replacer
+        if pattern is None: return text
+        return pattern.sub(lambda match: replacements[match.group()], text)
+
     @catch(SettingsError)
     def load(self) -> None:
         if not os.path.isfile(self.json_path):
@@ -61,6 +83,7 @@ class Settings(object):
 
         self.json_date = os.path.getmtime(self.json_path)
         self.json_hash = self._get_hash()
+        self._set_replacer()
         logger.info('Parsed settings')
 
     @catch(SettingsError)
@@ -81,6 +104,7 @@ class Settings(object):
 
         self.json_date = os.path.getmtime(self.json_path)
         self.json_hash = json_hash
+        self._set_replacer()
         logger.info('Saved settings')
 
     @catch(SettingsError)
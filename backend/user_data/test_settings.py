@@ -0,0 +1,35 @@
+import random
+from backend.config.config import CONFIG
+from backend.user_data.settings import Settings
+
+CHARS = 'ab <>«»"—–-' + ''.join(CONFIG.Replacements)
+
+
+def replace_reference(text: str, replacements: dict[str, str]) -> str:
+    # the replacement loop before the compiled pattern, kept as reference
+    for chars in replacements.keys():
+        text = text.replace(chars, replacements.get(chars))
+    return text
+
+
+def test_replace_matches_reference() -> None:
+    rng = random.Random(0)
+    settings = Settings()
+    for _ in range(5000):
+        text = ''.join(rng.choices(CHARS, k = rng.randint(0, 40)))
+        assert settings.replace(text) == replace_reference(text, CONFIG.Replacements), text
+
+
+def test_replace_follows_changed_replacements() -> None:
+    settings = Settings()
+    assert settings.replace('«a» — b') == '"a" - b'
+    settings.replacements['a'] = 'x'
+    assert settings.replace('«a» — b') == '"x" - b'
+    settings.replacements = {}
+    assert settings.replace('«a» — b') == '«a» — b'
+
+
+def test_replace_prefers_longest_match() -> None:
+    settings = Settings()
+    settings.replacements = {'<': '(', '<<': '"'}
+    assert settings.replace('<<a<') == '"a('
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+from backend.logger.logger import logger
+from backend.config.config import CONFIG
+
+FILE_DIR = os.path.dirname(os.path.relpath(__file__))
+
+
+class TranslationMemory(object):
+    """
+    The TranslationMemory is a persistent store of translated sentences shared by all users.
+    The entries are keyed by model, languages, prompt version and the sentence tokens
+    and the least recently used entries are evicted above the maximum size.
+    """
+
+    __slots__ = (
+        'max_size',
+        'db_path',
+        'hits',
+        'misses',
+        '_inserts',
+        '_connection',
+        '_lock'
+    )
+
+    # maximum number of keys per query, below the variable limit of older sqlite versions
+    CHUNK_SIZE = 500
+
+    def __init__(self, max_size: int = CONFIG.memory_size, db_path: str = 'cache/memory.db') -> None:
+        """
+        :param max_size: maximum number of sentences in the memory
+        :param db_path: path to the sqlite database file
+        """
+        self.max_size = max_size
+        self.db_path = os.path.join(FILE_DIR, db_path)
+        self.hits: int = 0
+        self.misses: int = 0
+        self._inserts: int = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok = True)
+            self._connection = sqlite3.connect(self.db_path, check_same_thread = False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS memory (key TEXT PRIMARY KEY, targets TEXT NOT NULL, used REAL NOT NULL)'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS memory_used ON memory (used)')
+            self._connection.commit()
+            logger.info(f'Opened translation memory at "{self.db_path}"')
+        return self._connection
+
+    @staticmethod
+    def get_key(model_id: str, source_language: str, target_language: str,
+                prompt_version: str, source_words: list[str]) -> str:
+        data = '\x1e'.join((model_id, source_language, target_language, prompt_version, '\x1f'.join(source_words)))
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[str]]:
+        """
+        :param keys: the keys of the sentences
+        :return: the target words of the memorized sentences by their key
+        """
+        if not keys: return {}
+        found: dict[str, list[str]] = {}
+        try:
+            with self._lock:
+                connection = self._connect()
+                # one query per chunk within the variable limit of sqlite and one commit for all used times
+                for i in range(0, len(keys), self.CHUNK_SIZE):
+                    chunk = keys[i:i + self.CHUNK_SIZE]
+                    rows = connection.execute(
+                        f'SELECT key, targets FROM memory WHERE key IN ({", ".join("?" * len(chunk))})', chunk
+                    ).fetchall()
+                    found.update((key, json.loads(targets)) for key, targets in rows)
+                if found:
+                    used = time.time()
+                    connection.executemany('UPDATE memory SET used = ? WHERE key = ?',
+                                           ((used, key) for key in found))
+                    connection.commit()
+                self.hits += len(found)
+                self.misses += len(set(keys)) - len(found)
+        except sqlite3.Error as exception:
+            logger.error(f'Could not read from translation memory with exception: {exception}')
+        return found
+
+    def set_many(self, items: list[tuple[str, list[str]]]) -> None:
+        """
+        :param items: the keys and the target words of the sentences
+        """
+        if not items: return
+        try:
+            with self._lock:
+                connection = self._connect()
+                used = time.time()
+                connection.executemany(
+                    'INSERT OR REPLACE INTO memory (key, targets, used) VALUES (?, ?, ?)',
+                    ((key, json.dumps(target_words, ensure_ascii = False), used) for key, target_words in items)
+                )
+                self._inserts += len(items)
+                # the size is only checked every few inserts, so the memory may exceed the maximum slightly
+                if self._inserts >= max(self.max_size // 100, 1):
+                    self._evict(connection)
+                connection.commit()
+        except sqlite3.Error as exception:
+            logger.error(f'Could not write to translation memory with exception: {exception}')
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        self._inserts = 0
+        size = connection.execute('SELECT COUNT(*) FROM memory').fetchone()[0]
+        if size <= self.max_size: return
+        connection.execute(
+            'DELETE FROM memory WHERE key IN (SELECT key FROM memory ORDER BY used ASC LIMIT ?)',
+            (size - self.max_size,)
+        )
+        logger.info(f'Evicted {size - self.max_size} sentences from translation memory')
+
+    def get_stats(self) -> dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,49 @@
+import random
+from backend.utils import utilities as utils
+
+ENDINGS = ('', '', '', '', '.', '!', '?', '."', '?»', ',')
+
+
+def get_words(rng: random.Random, count: int, max_len: int = 12) -> list[str]:
+    return [''.join(rng.choices('abcdefghij', k = rng.randint(1, max_len))) + rng.choice(ENDINGS)
+            for _ in range(count)]
+
+
+def test_yield_range_eos_matches_yield_batch_eos() -> None:
+    rng = random.Random(0)
+    for _ in range(2000):
+        words = get_words(rng, rng.randint(0, 80))
+        char_limit = rng.randint(5, 120)
+        # yield_batch_eos yields an empty batch in front of a single word longer than the limit
+        expected = [batch for batch in utils.yield_batch_eos(words, char_limit) if batch]
+        assert [words[start:stop] for start, stop in utils.yield_range_eos(words, char_limit)] == expected
+
+
+def test_yield_range_eos_covers_all_words() -> None:
+    rng = random.Random(1)
+    for _ in range(500):
+        words = get_words(rng, rng.randint(1, 80), max_len = 30)
+        ranges = list(utils.yield_range_eos(words, char_limit = rng.randint(5, 60)))
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(words)
+        assert all(stop == start for (_, stop), (start, _) in zip(ranges, ranges[1:]))
+        assert all(start < stop for start, stop in ranges)
+
+
+def test_yield_range_eos_with_eos_indices_and_size() -> None:
+    rng = random.Random(2)
+    for _ in range(500):
+        words = get_words(rng, rng.randint(0, 80))
+        char_limit = rng.randint(5, 120)
+        expected = list(utils.yield_range_eos(words, char_limit))
+        eos_indices = utils.get_eos_indices(words)
+        assert list(utils.yield_range_eos(words, char_limit, eos_indices = eos_indices)) == expected
+        # a size of twice the length with twice the offset and limit yields the same ranges
+        assert list(utils.yield_range_eos(words, 2 * char_limit, offset = 2, eos_indices = eos_indices,
+                                          size = lambda word: 2 * len(word))) == expected
+
+
+def test_yield_sentences() -> None:
+    words = ['Ein', 'Satz.', 'Noch', 'einer!', 'Rest']
+    assert list(utils.yield_sentences(words)) == [(0, 2), (2, 4), (4, 5)]
+    assert list(utils.yield_sentences(words[:4])) == [(0, 2), (2, 4)]
+    assert list(utils.yield_sentences([])) == []
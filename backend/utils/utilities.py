@@ -1,5 +1,14 @@
 import re
-from typing import Iterator
+import httpx
+import asyncio
+import functools
+import itertools
+import threading
+from re import Pattern
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import (Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Hashable, Iterable, Iterator,
+                    Optional, Sequence, Union)
 from backend.config.config import CONFIG
 
 
@@ -39,6 +48,80 @@ def yield_batch(string_list: list[str], char_limit: int, offset: int = 1) -> Ite
         yield batch
 
 
+@functools.lru_cache(maxsize = 32)
+def get_eos_pattern(endofs: str = CONFIG.Regex.endofs, quotes: str = CONFIG.Regex.quotes) -> Pattern:
+    # Get the compiled pattern, that matches strings ending a sentence
+    return re.compile(rf'.*?[{endofs}][{quotes}]?$')
+
+
+def get_eos_indices(string_list: Iterable[str], endofs: str = CONFIG.Regex.endofs,
+                    quotes: str = CONFIG.Regex.quotes) -> list[int]:
+    """
+    Get the sentence boundaries of a list of strings.
+
+    Args:
+        string_list: List of strings
+        endofs: Characters considered as end of sentence
+        quotes: Characters considered as quotes
+
+    Returns:
+        The indices after every string, which ends a sentence.
+    """
+
+    pattern = get_eos_pattern(endofs, quotes)
+    return [i + 1 for i, string in enumerate(string_list) if pattern.match(string)]
+
+
+def yield_range_eos(string_list: list[str], char_limit: int, offset: int = 1,
+                    endofs: str = CONFIG.Regex.endofs, quotes = CONFIG.Regex.quotes,
+                    eos_indices: Optional[Sequence[int]] = None,
+                    size: Callable[[str], int] = len) -> Iterator[tuple[int, int]]:
+    """
+    Yield index ranges of batches that fit within a character limit, considering sentence boundaries.
+    The batches are the same as of yield_batch_eos, but with precomputed boundaries and any size of a string.
+
+    Args:
+        string_list: List of strings to batch
+        char_limit: Maximum characters per batch, or the maximum size in the unit of size (e.g., tokens)
+        offset: Additional character count per string (e.g., for separators)
+        endofs: Characters considered as end of sentence
+        quotes: Characters considered as quotes
+        eos_indices: Precomputed sentence boundaries, which replace endofs and quotes
+        size: Size of a string, the number of characters by default
+
+    Yields:
+        Tuples of the start and stop index of batches within the character limit, ending at sentence boundaries.
+    """
+
+    if eos_indices is None:
+        eos_indices = get_eos_indices(string_list, endofs = endofs, quotes = quotes)
+    is_eos = bytearray(len(string_list) + 1)
+    for index in eos_indices:
+        is_eos[index] = 1
+    prefix = list(itertools.accumulate((size(string) + offset for string in string_list), initial = 0))
+    # start of the current batch and stop of its last complete sentence
+    start, last_valid = 0, 0
+    for i in range(len(string_list)):
+        # Check if adding the current string exceeds the character limit
+        if prefix[i + 1] - prefix[start] > char_limit:
+            # If a valid end of sentence index exists, yield up to the end of the last sentence
+            if last_valid > start:
+                yield start, last_valid
+                start = last_valid
+            # Otherwise yield the current batch without the current string
+            else:
+                if i > start:
+                    yield start, i
+                start = i
+            last_valid = start
+        # Get last valid end of sentence index
+        if is_eos[i + 1]:
+            last_valid = i + 1
+    # Yield the last batch if it is not empty
+    if start < len(string_list):
+        yield start, len(string_list)
+
+
 def yield_batch_eos(string_list: list[str], char_limit: int, offset: int = 1,
                     endofs: str = CONFIG.Regex.endofs, quotes = CONFIG.Regex.quotes) -> Iterator[list[str]]:
     """
@@ -57,7 +140,7 @@ def yield_batch_eos(string_list: list[str], char_limit: int, offset: int = 1,
 
     last_valid_index = 0
     batch, batch_len = [], 0
-    pattern = re.compile(rf'.*?[{endofs}][{quotes}]?$')
+    pattern = get_eos_pattern(endofs, quotes)
     string_data = ((string, len(string) + offset, bool(pattern.match(string))) for string in string_list)
     for string, str_len, eos in string_data:
         batch_len += str_len
@@ -69,6 +152,7 @@ def yield_batch_eos(string_list: list[str], char_limit: int, offset: int = 1,
             # If a valid end of sentence index exists
             if last_valid_index > 0:
                 yield batch[:last_valid_index]
+                # the carried-over words are yielded with the next batch, so the re-summing is linear overall
                 batch = batch[last_valid_index:] + [string]
                 batch_len = sum(len(word) + offset for word in batch)
             else:
@@ -82,3 +166,140 @@ def yield_batch_eos(string_list: list[str], char_limit: int, offset: int = 1,
     # Yield the last batch if it is not empty
     if batch:
         yield batch
+
+
+def yield_sentences(string_list: list[str], endofs: str = CONFIG.Regex.endofs,
+                    quotes: str = CONFIG.Regex.quotes,
+                    eos_indices: Optional[Sequence[int]] = None) -> Iterator[tuple[int, int]]:
+    """
+    Yield the index ranges of the sentences in a list of strings.
+
+    Args:
+        string_list: List of strings
+        endofs: Characters considered as end of sentence
+        quotes: Characters considered as quotes
+        eos_indices: Precomputed sentence boundaries, which replace endofs and quotes
+
+    Yields:
+        Tuples of the start and stop index of every sentence.
+    """
+
+    start = 0
+    if eos_indices is None:
+        eos_indices = get_eos_indices(string_list, endofs = endofs, quotes = quotes)
+    for stop in eos_indices:
+        yield start, stop
+        start = stop
+    # Yield the last sentence even without end of sentence mark
+    if start < len(string_list):
+        yield start, len(string_list)
+
+
+def map_batches(func: Callable[[list[str]], list[str]], batches: Iterable[list[str]],
+                executor: Executor) -> list[list[str]]:
+    """
+    Dispatch batches concurrently to an executor and collect the results in the original order.
+
+    Args:
+        func: Function to call for every batch
+        batches: Batches of strings
+        executor: Executor bounding the number of concurrent calls
+
+    Returns:
+        List of results in the same order as the batches.
+    """
+
+    # Executor.map preserves the order and cancels pending batches if one of them fails
+    return list(executor.map(func, batches))
+
+
+async def iter_batches(func: Callable[[list[str]], Awaitable[list[str]]], batches: Iterable[list[str]],
+                       semaphore: Optional[AsyncContextManager] = None) -> AsyncIterator[tuple[int, list[str]]]:
+    """
+    Dispatch batches concurrently on the event loop and yield the results as soon as they are finished.
+
+    Args:
+        func: Coroutine function to call for every batch
+        batches: Batches of strings
+        semaphore: Semaphore bounding the number of concurrent calls, None if func bounds them itself
+
+    Yields:
+        Tuples of the batch index and its result in the order of completion.
+    """
+
+    async def bounded(index: int, batch: list[str]) -> tuple[int, list[str]]:
+        if semaphore is None: return index, await func(batch)
+        async with semaphore:
+            return index, await func(batch)
+
+    tasks = [asyncio.ensure_future(bounded(index, batch)) for index, batch in enumerate(batches)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # cancel the pending batches if one of them fails or the caller stops iterating
+        for task in tasks:
+            task.cancel()
+
+
+def get_mounts(proxies: Optional[dict],
+               transport: type[Union[httpx.HTTPTransport, httpx.AsyncHTTPTransport]] = httpx.HTTPTransport) -> dict:
+    """
+    Convert the proxy settings to httpx transport mounts.
+
+    Args:
+        proxies: Proxy settings with the keys 'http' and 'https'
+        transport: The httpx transport class, sync or async
+
+    Returns:
+        Dictionary of url patterns mapped to proxy transports.
+    """
+
+    if not isinstance(proxies, dict):
+        return {}
+    return {f'{scheme}://': transport(proxy = f'http://{proxies.get(scheme)}')
+            for scheme in ('http', 'https') if proxies.get(scheme, '')}
+
+
+class LRUCache(object):
+    """
+    A thread-safe least recently used cache with a limited number of entries.
+    """
+
+    __slots__ = (
+        'max_size',
+        '_data',
+        '_lock'
+    )
+
+    def __init__(self, max_size: int = 100_000) -> None:
+        """
+        :param max_size: maximum number of entries before the least recently used entries are evicted
+        """
+        self.max_size = max_size
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last = False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
@@ -154,6 +154,7 @@ def build_app() -> bool:
         '--add-data', f'{pathlib.Path(nicegui.__file__).parent}{os.pathsep}nicegui',
         '--add-data', f'./_data/config.yml{os.pathsep}./backend/config/',
         '--add-data', f'./backend/decoder/prompt.txt{os.pathsep}./backend/decoder/',
+        '--add-data', f'./backend/decoder/prompt_sentences.txt{os.pathsep}./backend/decoder/',
         '--add-data', f'./backend/fonts/{os.pathsep}./backend/fonts/',
         '--add-data', f'./frontend/pages/ui/labels/{os.pathsep}./frontend/pages/ui/labels/',
         '--add-data', f'./frontend/pages/ui/icon/{os.pathsep}./frontend/pages/ui/icon/',
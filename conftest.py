@@ -0,0 +1,2 @@
+# the neural translator test is a manual script, which needs an api key and a source text
+collect_ignore = ['backend/decoder/test_neural_trans.py']
@@ -1,10 +1,13 @@
+import math
 import pathlib
 import asyncio
 import traceback
-from nicegui import ui, events
+from typing import Coroutine
+from nicegui import ui, events, Client, background_tasks
 from requests.exceptions import ConnectionError as HTTPConnectionError, ProxyError
 from backend.error.error import DecoderError
 from backend.logger.logger import logger
+from backend.config.config import CONFIG
 from backend.decoder.pdf import PDF
 from frontend.pages.ui.error import catch
 from frontend.pages.ui.config import URLS, JS, top_right
@@ -70,8 +73,7 @@ class Decoding(Page):
     def _set_grid_values(self, preload: bool = False, new_source: bool = False,
                          new_indices: bool = False) -> None:
         self._ui_grid.set_values(
-            source_words = self.decoder.source_words,
-            target_words = self.decoder.target_words,
+            document = self.decoder.document,
             preload = preload,
             new_source = new_source,
             new_indices = new_indices
@@ -79,7 +81,7 @@ class Decoding(Page):
 
     @catch
     def _get_grid_values(self) -> None:
-        self.decoder.source_words, self.decoder.target_words = self._ui_grid.get_values()
+        self.decoder.document = self._ui_grid.get_values()
         self.state.grid_page = self._ui_grid.get_grid_page()
 
     @catch
@@ -102,9 +104,18 @@ class Decoding(Page):
 
     async def _decode_words(self) -> None:
         try:
+            # only an interrupted decoding is resumed without a request of the user
+            resume = not self.state.decode and self.decoder.resumable
             if self.state.decode:
+                # the prefetching of the previous text must not write into the new one
+                self._prefetch_cancel()
                 self.decoder.split_text()
-                self._set_grid_values(preload = True, new_source = True)
+                # the target words are empty until the decoded batches are pushed to the grid
+                self._set_grid_values(new_source = True)
+            elif resume:
+                # an interrupted decoding is resumed with the missing sentences only
+                self._set_grid_values(new_indices = True)
+            if self.state.decode or resume:
                 notification = ui.notification(
                     message = f'{self.UI_LABELS.DECODING.Messages.decoding} {len(self.decoder.source_words)}',
                     position = 'top',
@@ -116,37 +127,86 @@ class Decoding(Page):
                     close_button = self.UI_LABELS.DECODING.Messages.cancel,
                     on_dismiss = self._task_cancel
                 )
-                await self._task_handler()
-                self.decoder.apply_dict()
-                self._set_grid_values()
+                # the decoding jobs of all users share the workers, so the queue position and ETA are shown
+                timer = ui.timer(1.0, lambda: self._update_status(notification))
+                try:
+                    if self.decoder.lazy:
+                        # only the first pages are decoded, the other pages are decoded on demand
+                        await self._task_handler(self._decode_pages())
+                        if not self.state.task.cancelled(): self._on_page()
+                    else:
+                        await self._task_handler(self.decoder.decode_words_async(on_batch = self._ui_grid.set_targets))
+                    self.decoder.apply_dict()
+                    self._set_grid_values()
+                finally:
+                    # the status is not polled anymore after an error either
+                    timer.cancel()
                 notification.dismiss()
             else:
                 self._set_grid_values(new_indices = True)
+                self._on_page()
             self.state.decode = False
         except Exception as exception:
             logger.error(f'Error in "_decode_words" with exception: {exception}\n{traceback.format_exc()}')
             ui.notify(self.UI_LABELS.GENERAL.Error.internal, type = 'negative', position = 'top')
             self.state.decode = False
 
+    def _update_status(self, notification: ui.notification) -> None:
+        position, eta = self.decoder.get_status()
+        message = f'{self.UI_LABELS.DECODING.Messages.decoding} {len(self.decoder.source_words)}'
+        if position: message += f'\n{self.UI_LABELS.DECODING.Messages.queue} {position}'
+        if eta: message += f'\n{self.UI_LABELS.DECODING.Messages.eta} {math.ceil(eta)}'
+        notification.message = message
+
+    async def _decode_pages(self) -> None:
+        # decode the current page and prefetch the next pages in lazy mode
+        #   the page ranges are stale after an edit of the source words, the next page change prefetches again
+        generation = self.decoder.document.generation
+        for start, stop in self._ui_grid.get_page_ranges(ahead = CONFIG.prefetch_pages):
+            if generation != self.decoder.document.generation: return
+            await self.decoder.decode_range_async(start = start, stop = stop, on_batch = self._ui_grid.set_targets)
+
+    async def _prefetch(self, client: Client) -> None:
+        try:
+            await self._decode_pages()
+        except asyncio.exceptions.CancelledError:
+            logger.info('Prefetching cancelled')
+        except Exception as exception:
+            logger.warning(f'Prefetching pages failed with exception: {exception}')
+            # the prefetching runs in the background, so the notification needs the client of the page
+            with client:
+                self._notify_error(exception)
+
+    def _prefetch_cancel(self) -> None:
+        if self.state.prefetch is None: return
+        self.state.prefetch.cancel()
+
+    def _on_page(self) -> None:
+        if not self.decoder.lazy: return
+        # only the pages around the current page are prefetched, the prefetching of the previous page is cancelled
+        self._prefetch_cancel()
+        self.state.prefetch = background_tasks.create(self._prefetch(ui.context.client), name = 'prefetch')
+
+    def _notify_error(self, exception: Exception) -> None:
+        if isinstance(exception, ProxyError):
+            ui.notify(self.UI_LABELS.SETTINGS.Messages.proxy_error, type = 'warning', position = 'top')
+        elif isinstance(exception, HTTPConnectionError):
+            ui.notify(self.UI_LABELS.SETTINGS.Messages.connect_error, type = 'warning', position = 'top')
+        elif isinstance(exception, DecoderError) and exception.code == 429:
+            ui.notify(self.UI_LABELS.DECODING.Messages.rate_limit, type = 'warning', position = 'top')
+        else:
+            ui.notify(self.UI_LABELS.GENERAL.Error.internal, type = 'warning', position = 'top')
+
     @catch
-    async def _task_handler(self) -> None:
+    async def _task_handler(self, coroutine: Coroutine) -> None:
         try:
-            self.state.task = asyncio.create_task(asyncio.to_thread(self.decoder.decode_words))
-            await self.state.task
-            self.state.task = asyncio.create_task(asyncio.to_thread(self.decoder.translate_sentences))
+            self.state.task = asyncio.create_task(coroutine)
             await self.state.task
             logger.info('Decoding done.')
         except asyncio.exceptions.CancelledError:
             logger.info('Decoding cancelled')
-        except ProxyError:
-            ui.notify(self.UI_LABELS.SETTINGS.Messages.proxy_error, type = 'warning', position = 'top')
-        except HTTPConnectionError:
-            ui.notify(self.UI_LABELS.SETTINGS.Messages.connect_error, type = 'warning', position = 'top')
-        except DecoderError as exception:
-            if exception.code == 429:
-                ui.notify(self.UI_LABELS.DECODING.Messages.rate_limit, type = 'warning', position = 'top')
-                return
-            ui.notify(self.UI_LABELS.GENERAL.Error.internal, type = 'warning', position = 'top')
+        except (ProxyError, HTTPConnectionError, DecoderError) as exception:
+            self._notify_error(exception)
 
     @catch
     def _apply_dict(self) -> None:
@@ -157,8 +217,7 @@ class Decoding(Page):
 
     @catch
     def create_pdf(self) -> None:
-        _hash = hash(f'{self.state.title}{self.settings.pdf_params}'
-                     f'{self.decoder.target_words}{self.decoder.source_words}')
+        _hash = hash((self.state.title, f'{self.settings.pdf_params}', self.decoder.document.get_hash()))
         if self.state.c_hash != _hash:
             self.state.c_hash = _hash
             pdf = PDF(**self.settings.pdf_params)
@@ -177,6 +236,7 @@ class Decoding(Page):
     async def _upload_handler(self, event: events.UploadEventArguments) -> None:
         try:
             data = await event.file.text(encoding = 'utf-8')
+            self._prefetch_cancel()
             self.decoder.from_json_str(data = data)
             self.state.title = pathlib.Path(event.file.name).stem
             self.decoder.source_text = ' '.join(self.decoder.source_words)
@@ -191,9 +251,27 @@ class Decoding(Page):
         ui_dialog(label_list = self.UI_LABELS.DECODING.Dialogs).open()
 
     @catch
-    def _dialog_sentences(self) -> None:
-        if not self.decoder.sentences: return
-        ui_dialog(label_list = self.decoder.sentences[self._ui_grid.slice], max_width = 80, u_width = 'vw').open()
+    async def _dialog_sentences(self) -> None:
+        if not self.decoder.source_words: return
+        self._get_grid_values()
+        # the sentences are only translated for the current page, when they are shown
+        page_ranges = self._ui_grid.get_page_ranges()
+        if not page_ranges: return
+        start, stop = page_ranges[0]
+        try:
+            sentences = await self.decoder.translate_sentences_async(start = start, stop = stop)
+        except ProxyError:
+            ui.notify(self.UI_LABELS.SETTINGS.Messages.proxy_error, type = 'warning', position = 'top')
+            return
+        except HTTPConnectionError:
+            ui.notify(self.UI_LABELS.SETTINGS.Messages.connect_error, type = 'warning', position = 'top')
+            return
+        except DecoderError as exception:
+            if exception.code == 429:
+                ui.notify(self.UI_LABELS.DECODING.Messages.rate_limit, type = 'warning', position = 'top')
+                return
+            raise exception
+        ui_dialog(label_list = sentences, max_width = 80, u_width = 'vw').open()
 
     @catch
     def _pdf_dialog(self) -> None:
@@ -281,8 +359,7 @@ class Decoding(Page):
                 grid_page = self.state.grid_page,
                 find_str = self.state.find,
                 page_label = self.UI_LABELS.DECODING.Table.page_label,
-                endofs = self.decoder.regex.endofs,
-                quotes = self.decoder.regex.quotes
+                on_page = self._on_page
             )
             self._ui_grid.page(dark_mode = self.settings.app.dark_mode)
         with ui.footer(): self._ui_grid.pagination()
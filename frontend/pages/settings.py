@@ -43,9 +43,10 @@ class Settings(Page):
         self.settings.app.https = ''
 
     @catch
-    def _connection_check(self) -> None:
+    async def _connection_check(self) -> None:
         try:
-            self.decoder.translate(source = ['test'])
+            # the async request does not block the event loop while it waits for the rate limiter
+            await self.decoder.translate_async(source = ['test'])
             ui.notify(self.UI_LABELS.SETTINGS.Messages.connect_success, type = 'positive', position = 'top')
         except ProxyError:
             ui.notify(self.UI_LABELS.SETTINGS.Messages.proxy_error, type = 'warning', position = 'top')
@@ -1,8 +1,7 @@
-import re
-from re import Pattern
-from typing import Union, Iterable
+from typing import Callable, Union, Iterable, Sequence
 from nicegui import ui, events
 from backend.config.config import CONFIG
+from backend.decoder.document import DecodedDocument
 from backend.utils.utilities import maxlen
 from frontend.pages.ui.config import DEFAULT_COLS, COLORS, JS, top_left, bot_right
 
@@ -272,27 +271,25 @@ class UIGrid(Table):
 
 
 class UIGridPages(object):
-    __slots__ = ('_page_number', '_page_size', '_prev_page', '_find_str', '_page_label', '_pattern',
-                 'source_words', 'target_words', '_eos_indices', '_indices', '_s_indices',
-                 '_ui_grid', '_ui_page', '_visible')
+    __slots__ = ('_page_number', '_page_size', '_prev_page', '_find_str', '_page_label',
+                 'document', '_eos_indices', '_indices',
+                 '_ui_grid', '_ui_page', '_visible', '_on_page')
 
     def __init__(self, grid_page: dict = None, find_str: str = '', page_label = 'Words per page <=',
-                 endofs: str = CONFIG.Regex.endofs, quotes: str = CONFIG.Regex.quotes) -> None:
+                 on_page: Callable[[], None] = None) -> None:
         self._page_number: int = 1
         self._page_size: int = CONFIG.grid_options[2]
         self._prev_page: int = 1
         self._set_grid_page(grid_page)
         self._find_str = find_str
         self._page_label = page_label
-        self._pattern: Pattern = re.compile(rf'.*?[{endofs}][{quotes}]?$')
-        self.source_words: list[str] = []
-        self.target_words: list[str] = []
-        self._eos_indices: tuple[int] = ()  # end of sentence word indices
+        self.document = DecodedDocument()
+        self._eos_indices: Sequence[int] = ()  # end of sentence word indices
         self._indices: list[int] = []  # word indices per page
-        self._s_indices: list[int] = []  # sentence indices per page
         self._ui_grid: UIGrid
         self._ui_page: ui.pagination
         self._visible: bool = False
+        self._on_page = on_page  # called after the current page or the page size changed
 
     def page(self, *args, **kwargs) -> None:
         with ui.card().style('min-width:1000px; min-height:562px'):
@@ -322,21 +319,23 @@ class UIGridPages(object):
 
     @ui.refreshable
     def _table(self, *args, **kwargs) -> None:
-        if not self.source_words or not self._indices:
+        if not len(self.document) or not self._indices:
             self._visible = False
             self._ui_grid = UIGrid()
             return
         self._visible = True
         p = self._page_number - 1
+        # only the words of the current page are copied into the grid
+        source_words, target_words = self.document.get_page(self._indices[p], self._indices[p + 1])
         self._ui_grid = UIGrid(
-            source_words = self.source_words[self._indices[p]:self._indices[p + 1]],
-            target_words = self.target_words[self._indices[p]:self._indices[p + 1]],
+            source_words = list(source_words),
+            target_words = list(target_words),
             *args, **kwargs
         )
         self._ui_grid.mark_cells(self._find_str)
 
-    def _get_indices(self, source_words: list[str]) -> None:
-        self._eos_indices = tuple(i + 1 for i, word in enumerate(source_words) if self._pattern.match(word))
+    def _get_indices(self) -> None:
+        self._eos_indices = self.document.eos_indices
 
     def _set_indices(self) -> None:
         if not self._eos_indices: return
@@ -357,19 +356,24 @@ class UIGridPages(object):
             self._ui_page.value = 1  # have to be first!!!
             self._prev_page = 1
             self._set_indices()
-            self._set_s_indices()
             self._table.refresh()
+            if self._on_page: self._on_page()
 
     def _scroll(self) -> None:
         self._upd_values()
         self._prev_page = self._page_number
         self._table.refresh()
+        if self._on_page: self._on_page()
 
     def _upd_values(self):
-        if self.source_words and self._indices:
+        if len(self.document) and self._indices:
             p = self._prev_page - 1
-            (self.source_words[self._indices[p]:self._indices[p + 1]],
-             self.target_words[self._indices[p]:self._indices[p + 1]]) = self._ui_grid.get_values()
+            generation = self.document.generation
+            self.document.set_page(self._indices[p], self._indices[p + 1], *self._ui_grid.get_values())
+            # an edit of the source words may move the sentence boundaries and the pages after it
+            if generation != self.document.generation:
+                self._get_indices()
+                self._set_indices()
 
     def _set_grid_page(self, grid_page: dict) -> None:
         if grid_page is None: grid_page = {}
@@ -380,26 +384,37 @@ class UIGridPages(object):
     def get_grid_page(self) -> dict:
         return {'page': self._page_number, 'rowsPerPage': self._page_size}
 
-    def set_values(self, source_words: list[str], target_words: list[str], preload: bool = False,
+    def set_values(self, document: DecodedDocument, preload: bool = False,
                    new_source: bool = False, new_indices: bool = False) -> None:
-        if not source_words: return
+        if not len(document): return
+        self.document = document
         if new_source:
             self._ui_page.value = 1
             self._prev_page = 1
-            self._get_indices(source_words)
+            self._get_indices()
             self._set_indices()
-            self._set_s_indices()
         if new_indices:
-            self._get_indices(source_words)
+            self._get_indices()
             self._set_indices()
-            self._set_s_indices()
-        self.source_words = source_words
-        self.target_words = target_words
         self._table.refresh(preload = preload)
 
-    def get_values(self) -> tuple[list[str], list[str]]:
+    def set_targets(self, start: int, target_words: list[str]) -> None:
+        # decoded batches are pushed while decoding, the table is only refreshed if the batch is on the current page
+        #   the target words are already filled in place in the shared document
+        stop = start + len(target_words)
+        if not self._indices: return
+        p = self._page_number - 1
+        if start < self._indices[p + 1] and stop > self._indices[p]:
+            self._table.refresh(preload = False)
+
+    def get_page_ranges(self, ahead: int = 0) -> list[tuple[int, int]]:
+        # word ranges of the current page and the following pages
+        p = self._page_number - 1
+        return [(self._indices[i], self._indices[i + 1]) for i in range(p, min(p + ahead + 1, len(self._indices) - 1))]
+
+    def get_values(self) -> DecodedDocument:
         self._upd_values()
-        return self.source_words, self.target_words
+        return self.document
 
     async def get_selected(self) -> str:
         return await self._ui_grid.get_selected()
@@ -407,13 +422,3 @@ class UIGridPages(object):
     def highlight_text(self, find_str: str = '') -> None:
         self._find_str = find_str
         self._ui_grid.mark_cells(self._find_str)
-
-    def _set_s_indices(self):
-        self._s_indices = [0]
-        self._s_indices.extend((self._eos_indices.index(i) + 1) * 3 for i in self._indices[1:])
-
-    @property
-    def slice(self) -> slice:
-        p = self._page_number - 1
-        if not self._s_indices: return slice(None)
-        return slice(self._s_indices[p], self._s_indices[p + 1] - 1)
@@ -54,7 +54,7 @@ class Page(ABC):
 
     def __init__(self) -> None:
         self.state: State = None  # type: ignore
-        self.word_limit: int = CONFIG.word_limit
+        self.word_limit: int = CONFIG.lazy_word_limit
         self.max_file_size: int = self.word_limit * 50
         self.max_decode_size: int = self.max_file_size * 2
         self.auto_upload: bool = CONFIG.Upload.auto_upload
@@ -101,6 +101,14 @@ class State(object):
     def task(self, value: asyncio.Task) -> None:
         self._storage['task'] = value
 
+    @property
+    def prefetch(self) -> asyncio.Task:
+        return self.get('prefetch', None)
+
+    @prefetch.setter
+    def prefetch(self, value: asyncio.Task) -> None:
+        self._storage['prefetch'] = value
+
     @property
     def c_hash(self) -> int:
         return self.get('c_hash', 0)